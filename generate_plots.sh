@@ -7,6 +7,6 @@ echo "Installing dependencies"
 python3 -m pip install .
 
 echo "Generating Plots..."
-python3 vs_csv_plotter/generate_plots.py
+python3 vs_csv_plotter/generate_plots.py "$@"
 
 echo "Successfully generated plots."
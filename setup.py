@@ -1,10 +1,16 @@
 """Sets up local workspace."""
+# Import built-in modules
+import re
+
 # Import setuptools
 from setuptools import find_packages, setup
 
+with open("vs_csv_plotter/constants.py", encoding="utf-8") as constants_file:
+    VERSION = re.search(r'^VERSION = "(.+)"$', constants_file.read(), re.M).group(1)
+
 setup(
     name='vs_csv_plotter',
-    version='0.1.0',
+    version=VERSION,
     packages=find_packages(),
     install_requires=[
         'pandas',
@@ -15,4 +21,9 @@ setup(
         'scipy',
         'datetime'
     ],
+    extras_require={
+        # Caches parsed CSV files as Feather files.
+        'cache': ['pyarrow'],
+        'test': ['pytest'],
+    },
 )
@@ -0,0 +1,39 @@
+"""Shared fixtures of the tests."""
+# Import built-in modules
+import os
+import sys
+
+# Import third-party modules
+import pytest
+
+# The scripts import their modules relative to the package folder.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vs_csv_plotter"))
+
+# Import local modules
+import constants  # noqa: E402 Needs the package folder on the path
+import generate_plots  # noqa: E402
+from scripts import synthetic  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    """Run every test in an empty folder, as the data folders are relative paths.
+
+    Returns:
+        pathlib.Path: Folder the test runs in.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("VS_CSV_PLOTTER_OFFLINE", "")
+    return tmp_path
+
+
+@pytest.fixture
+def generator(workspace, monkeypatch):
+    """Ingest a synthetic export without downloading.
+
+    Returns:
+        generate_plots.PlotGenerator: Generator holding the survey data.
+    """
+    monkeypatch.setenv(constants.CREDENTIAL_ENV_OFFLINE, "1")
+    synthetic.write_survey_csv(os.path.join(constants.DATA_FOLDER, "export.csv"), 500)
+    return generate_plots.PlotGenerator()
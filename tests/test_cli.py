@@ -0,0 +1,26 @@
+"""Tests of the command line."""
+# Import built-in modules
+import os
+
+# Import local modules
+import constants
+import generate_plots
+from scripts import synthetic
+
+# Import third-party modules
+import pytest
+
+
+@pytest.mark.parametrize("option", ["--list", "--dry-run"])
+def test_list_without_credentials(option, workspace, monkeypatch, capsys):
+    """Listing charts uses the CSV files on disk and asks for no credentials."""
+    monkeypatch.setattr(constants, "CSV_DOWNLOAD_LIST", ["http://127.0.0.1:9/s/export"])
+    monkeypatch.setattr(constants, "CREDENTIAL_SOURCES", ["env", "file"])
+    monkeypatch.setattr(constants, "CREDENTIALS_FILE", str(workspace / "credentials.json"))
+    monkeypatch.delenv(constants.CREDENTIAL_ENV_USERNAME, raising=False)
+    monkeypatch.delenv(constants.CREDENTIAL_ENV_PASSWORD, raising=False)
+    synthetic.write_survey_csv(os.path.join(constants.DATA_FOLDER, "export.csv"), 200)
+
+    assert generate_plots.main([option, "support_*"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert "support_over_26" in [line.split("\t")[0] for line in lines]
@@ -0,0 +1,111 @@
+"""Tests of the incremental downloads against a local stand-in server."""
+# Import built-in modules
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Import local modules
+import constants
+from scripts import credentials, downloader, file_utils
+
+# Import third-party modules
+import pytest
+import requests
+
+USERNAME = "user"
+PASSWORD = "secret"
+BODY = "Zeitstempel,Wie alt bist du?\n" + "16.10.2023 12:00:00,Über 26\n" * 1000
+ETAG = '"v1"'
+
+
+class ExportHandler(BaseHTTPRequestHandler):
+    """Serve CSV exports like the cloud, with basic auth and ETags."""
+
+    def do_GET(self):  # noqa: N802 Name required by BaseHTTPRequestHandler
+        """Answer a download request."""
+        self.server.requests.append(self.headers.get("If-None-Match"))
+        token = base64.b64encode("{0}:{1}".format(USERNAME, PASSWORD).encode()).decode()
+        if self.headers.get("Authorization") != "Basic {0}".format(token):
+            self.send_response(401)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = BODY.encode()
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.path.endswith("interrupted"):
+            # Promise the whole body but close the connection halfway.
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002 Signature of the base class
+        """Keep the test output quiet."""
+
+
+@pytest.fixture
+def export_server():
+    """Start the stand-in server on a free port.
+
+    Yields:
+        ThreadingHTTPServer: Server with the received If-None-Match headers in `requests`.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ExportHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = "http://127.0.0.1:{0}/s".format(server.server_address[1])
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_and_not_modified(export_server, workspace):
+    """A second download sends the saved ETag and keeps the file."""
+    url = "{0}/export".format(export_server.url)
+    state_file = str(workspace / "state.json")
+    with downloader.create_session(USERNAME, PASSWORD) as session:
+        first = downloader.download_all([url], "csv", session, state_file=state_file)
+        second = downloader.download_all([url], "csv", session, state_file=state_file)
+
+    assert first == {url: downloader.DOWNLOADED}
+    assert second == {url: downloader.NOT_MODIFIED}
+    assert export_server.requests == [None, ETAG]
+    assert (workspace / "csv" / "export.csv").read_text(encoding="utf-8") == BODY
+    assert downloader.load_state(state_file)[url]["etag"] == ETAG
+
+
+def test_rejected_credentials(export_server, workspace, monkeypatch):
+    """Rejected credentials of the only source fail after one attempt."""
+    url = "{0}/export".format(export_server.url)
+    monkeypatch.setattr(constants, "CSV_DOWNLOAD_LIST", [url])
+    monkeypatch.setattr(constants, "CREDENTIAL_SOURCES", ["env"])
+    monkeypatch.setattr(constants, "DOWNLOAD_BACKOFF", 0)
+    monkeypatch.setenv(constants.CREDENTIAL_ENV_USERNAME, USERNAME)
+    monkeypatch.setenv(constants.CREDENTIAL_ENV_PASSWORD, "wrong")
+
+    with pytest.raises(credentials.AuthenticationError, match="after 1 attempts"):
+        file_utils.download_csv_data()
+    assert export_server.requests == [None]
+    assert not (workspace / constants.DATA_FOLDER / "export.csv").exists()
+
+
+def test_interrupted_download_keeps_previous_file(export_server, workspace):
+    """An interrupted body leaves neither a partial file nor a changed one."""
+    url = "{0}/interrupted".format(export_server.url)
+    file_path = workspace / "interrupted.csv"
+    file_path.write_text("previous", encoding="utf-8")
+
+    with downloader.create_session(USERNAME, PASSWORD) as session:
+        with pytest.raises(requests.RequestException):
+            downloader.download_file(session, url, str(workspace))
+
+    assert file_path.read_text(encoding="utf-8") == "previous"
+    assert sorted(path.name for path in workspace.iterdir()) == ["interrupted.csv"]
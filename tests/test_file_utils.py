@@ -0,0 +1,51 @@
+"""Tests of reading, converting and caching the CSV files."""
+# Import built-in modules
+import os
+
+# Import local modules
+import constants
+from scripts import file_utils, synthetic
+
+# Import third-party modules
+import pandas as pd
+import pytest
+
+
+def test_cache_of_removed_files_is_pruned(workspace):
+    """Feather files and manifest entries of removed CSV files are deleted."""
+    pytest.importorskip("pyarrow")
+    kept = synthetic.write_survey_csv(str(workspace / "csv" / "kept.csv"), 50, seed=1)
+    removed = synthetic.write_survey_csv(str(workspace / "csv" / "removed.csv"), 50, seed=2)
+    file_utils.concat_from_folder("csv", use_cache=True)
+    cache_folder = workspace / constants.DATA_CACHE_FOLDER
+    assert len(list(cache_folder.glob("*.feather"))) == 2
+
+    os.remove(removed)
+    csv_data = file_utils.concat_from_folder("csv", use_cache=True)
+
+    assert len(csv_data) == 50
+    assert list(file_utils._load_data_cache_manifest()) == [kept]
+    assert list(cache_folder.glob("*.feather")) == [
+        workspace / file_utils._data_cache_file(kept)
+    ]
+
+
+def test_convert_timestamps_matches_per_row_conversion():
+    """The vectorized conversion agrees with the per-row one on mixed formats."""
+    timestamps = [
+        "Montag, 16. Oktober 2023 um 09:05:00 GMT+0:00",
+        "Freitag, 1. März 2024 um 23:59:59 GMT+0:00",
+        "Sonntag, 31. Dezember 2023 um 00:00:00 GMT+0:00",
+        "Montag, 16. Oktobr 2023 um 09:05:00 GMT+0:00",
+        "Montag, 16. Oktober 2023 um 9:05:00 GMT+0:00",
+        "2023-10-16 09:05:00",
+        "",
+    ]
+    converted = file_utils.convert_timestamps(pd.Series(timestamps + [None]))
+
+    expected = [file_utils.convert_timestamp(timestamp) for timestamp in timestamps]
+    assert converted.iloc[:-1].tolist() == [
+        pd.NaT if timestamp is None else pd.Timestamp(timestamp) for timestamp in expected
+    ]
+    assert converted.notna().sum() == 3
+    assert pd.isna(converted.iloc[-1])
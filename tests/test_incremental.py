@@ -0,0 +1,48 @@
+"""Tests of the incremental aggregation of growing exports."""
+# Import local modules
+from scripts import aggregation, file_utils, incremental, synthetic
+
+
+def test_multi_line_field_split_between_runs(workspace):
+    """A record whose quoted field spans lines is only counted once complete."""
+    csv_data = synthetic.survey_frame(10, seed=4)
+    csv_data["Nutzer*in"] = csv_data["Nutzer*in"] + '\nsays "hi"\n'
+    content = csv_data.to_csv(index=False).encode("utf-8")
+    # Write the last record only up to the first line break in its quoted field.
+    cut = content.index(b"\n", content.index(b"anon-9")) + 1
+    file_path = workspace / "csv" / "export.csv"
+    file_path.parent.mkdir()
+    file_path.write_bytes(content[:cut])
+
+    cube = incremental.update_cube("csv", "state.pkl")
+    assert cube.total() == 9
+
+    with open(file_path, "ab") as file:
+        file.write(content[cut:])
+    cube = incremental.update_cube("csv", "state.pkl")
+    expected = aggregation.SurveyCube.from_frame(
+        file_utils.replace_ger_eng(file_utils.read_survey_csv(str(file_path)))
+    )
+    assert cube.total() == expected.total() == 10
+    assert cube.counts(*aggregation.DIMENSIONS[:3]).equals(
+        expected.counts(*aggregation.DIMENSIONS[:3])
+    )
+
+
+def test_last_record_without_line_break(workspace):
+    """The last record of a finished export is counted without a line break."""
+    csv_data = synthetic.survey_frame(10, seed=5)
+    content = csv_data.to_csv(index=False).encode("utf-8").rstrip(b"\n")
+    file_path = workspace / "csv" / "export.csv"
+    file_path.parent.mkdir()
+    file_path.write_bytes(content)
+
+    assert incremental.update_cube("csv", "state.pkl").total() == 10
+    assert incremental.update_cube("csv", "state.pkl").total() == 10
+
+    # The export continues, the former last record is now complete.
+    with open(file_path, "ab") as file:
+        file.write(b"\n")
+        file.write(synthetic.survey_frame(3, seed=6).to_csv(index=False, header=False).encode())
+    cube = incremental.update_cube("csv", "state.pkl")
+    assert cube.total() == 13
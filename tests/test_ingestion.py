@@ -0,0 +1,66 @@
+"""Tests that all ingestion modes aggregate the same counts."""
+# Import local modules
+from scripts import aggregation, file_utils, incremental, partitions, synthetic
+
+# Import third-party modules
+import pandas as pd
+
+ROWS = 2000
+
+
+def sorted_table(cube):
+    """Order the answer table of a cube independently of the ingestion order.
+
+    Parameters:
+        cube (aggregation.SurveyCube): Cube to compare.
+
+    Returns:
+        pd.DataFrame: Answer combinations and counts sorted by answers.
+    """
+    return cube.table.sort_values(aggregation.DIMENSIONS).reset_index(drop=True)
+
+
+def ingest(folder_path):
+    """Aggregate the CSV files of a folder in every ingestion mode.
+
+    Parameters:
+        folder_path (str): Folder containing the CSV files.
+
+    Returns:
+        dict: SurveyCube keyed by ingestion mode.
+    """
+    csv_data = file_utils.concat_from_folder(folder_path, use_cache=False)
+    return {
+        "frame": aggregation.SurveyCube.from_frame(file_utils.replace_ger_eng(csv_data)),
+        "stream": aggregation.SurveyCube.from_folder(folder_path, chunksize=ROWS // 7),
+        "incremental": incremental.update_cube(folder_path, "incremental_state.pkl"),
+        "partitioned": partitions.combine(partitions.load(None, folder_path, "partitions")),
+    }
+
+
+def assert_same_cubes(cubes, rows):
+    """Compare the cubes of all ingestion modes with the frame mode.
+
+    Parameters:
+        cubes (dict): SurveyCube keyed by ingestion mode.
+        rows (int): Number of responses in the CSV files.
+    """
+    expected = cubes["frame"]
+    assert expected.total() == rows
+    for mode, cube in cubes.items():
+        pd.testing.assert_frame_equal(sorted_table(cube), sorted_table(expected), obj=mode)
+        pd.testing.assert_series_equal(cube.timeline, expected.timeline, obj=mode)
+
+
+def test_ingestion_modes_agree(workspace):
+    """Frame, stream, incremental and partitioned cubes hold the same counts."""
+    folder_path = str(workspace / "csv")
+    synthetic.write_survey_csv(str(workspace / "csv" / "first.csv"), ROWS, seed=1)
+    synthetic.write_survey_csv(str(workspace / "csv" / "second.csv"), ROWS // 2, seed=2)
+    assert_same_cubes(ingest(folder_path), ROWS + ROWS // 2)
+
+    # Rows appended to an export are only read again by the incremental mode.
+    synthetic.survey_frame(ROWS // 4, seed=3).to_csv(
+        workspace / "csv" / "second.csv", mode="a", header=False, index=False
+    )
+    assert_same_cubes(ingest(folder_path), ROWS + ROWS // 2 + ROWS // 4)
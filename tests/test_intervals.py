@@ -0,0 +1,63 @@
+"""Tests of the confidence intervals of answer shares."""
+# Import local modules
+import constants
+from scripts import intervals, plots
+from scripts.aggregation import DIMENSIONS, SurveyCube
+
+# Import third-party modules
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_wilson_matches_hand_computed_interval():
+    """8 of 10 answers give the textbook Wilson interval [0.490, 0.943]."""
+    low, high = intervals.wilson(np.array([[8, 2]]))
+
+    assert low[0, 0] == pytest.approx(0.4902, abs=1e-4)
+    assert high[0, 0] == pytest.approx(0.9433, abs=1e-4)
+    assert high[0, 1] == pytest.approx(1 - 0.4902, abs=1e-4)
+
+
+def test_bootstrap_reads_constants_when_called(monkeypatch):
+    """Seed and number of resamples are taken from constants at call time."""
+    counts = np.array([[30, 50, 20], [5, 3, 2]])
+    expected = intervals.bootstrap(counts, resamples=200, seed=7, workers=1)
+    monkeypatch.setattr(constants, "BOOTSTRAP_SEED", 7)
+    monkeypatch.setattr(constants, "BOOTSTRAP_RESAMPLES", 200)
+    monkeypatch.setattr(constants, "BOOTSTRAP_WORKERS", 1)
+    low, high = intervals.bootstrap(counts)
+
+    np.testing.assert_array_equal(low, expected[0])
+    np.testing.assert_array_equal(high, expected[1])
+    assert (low <= counts / counts.sum(axis=1, keepdims=True)).all()
+
+
+@pytest.mark.parametrize("method", ["wilson", "bootstrap"])
+def test_bands_are_centred_on_drawn_edges(method, monkeypatch):
+    """Missing support answers do not shift the intervals from the stacked edges."""
+    monkeypatch.setattr(constants, "CONFIDENCE_INTERVALS", True)
+    monkeypatch.setattr(constants, "CONFIDENCE_METHOD", method)
+    monkeypatch.setattr(constants, "BOOTSTRAP_RESAMPLES", 200)
+    table = pd.DataFrame(
+        [
+            (constants.OVER_26, 2, "Yes", "Yes", "No", 6),
+            (constants.OVER_26, 2, "No", "Yes", "No", 3),
+            (constants.OVER_26, 2, None, "Yes", "No", 3),
+            (constants.UNDER_26, 2, "Yes", "No", "No", 4),
+            (constants.UNDER_26, 5, "No", "No", "Yes", 2),
+            (constants.UNDER_26, 5, "Don't know", "No", "Yes", 2),
+        ],
+        columns=DIMENSIONS + ["count"],
+    )
+    spec = plots.plot_support_data_vs_financial_impact(SurveyCube(table, None))[0]
+
+    # Layers are stacked in the order of the categories at every rating.
+    relative_counts = spec.data.pivot(
+        index="wealth_index", columns=constants.SUPPORT_COLUMN, values="relative_count"
+    ).reindex(columns=spec.options["categories"]).fillna(0)
+    edges = relative_counts.cumsum(axis=1)
+    bands = spec.options["bands"]
+    assert len(bands) == len(edges) * (len(edges.columns) - 1)
+    for rating, layer, share in bands[["wealth_index", "layer", "share"]].itertuples(index=False):
+        assert share == pytest.approx(edges.loc[rating].iloc[layer])
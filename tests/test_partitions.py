@@ -0,0 +1,23 @@
+"""Tests of the partitioned dataset."""
+# Import built-in modules
+import os
+
+# Import local modules
+import constants
+from scripts import partitions, synthetic
+
+
+def test_weekly_partitions_are_named_by_first_day(workspace, monkeypatch):
+    """Weekly periods print as ranges with a "/", their names must not."""
+    monkeypatch.setattr(constants, "PARTITION_PERIOD", "W")
+    synthetic.write_survey_csv(str(workspace / "csv" / "export.csv"), 300)
+
+    cubes = partitions.load(None, "csv", "partitions")
+    periods = [period for _, period in cubes]
+    assert periods[0] == "2023-10-16"
+    assert all("/" not in period for period in periods)
+    assert sum(cube.total() for cube in cubes.values()) == 300
+    assert len(os.listdir(workspace / "partitions")) == len(periods) + 1
+
+    selected = partitions.load(["*/2023-10-16"], "csv", "partitions")
+    assert list(selected) == [("export", "2023-10-16")]
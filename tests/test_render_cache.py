@@ -0,0 +1,116 @@
+"""Tests of the cache keys deciding which charts are rendered again."""
+# Import built-in modules
+import os
+import time
+from importlib import metadata
+from concurrent.futures.process import BrokenProcessPool
+
+# Import local modules
+import constants
+from scripts import charts, executor, file_utils, render_cache, synthetic, watcher
+
+# Import third-party modules
+import pandas as pd
+import pytest
+
+
+def chart_keys(generator):
+    """Compute the cache key of every chart.
+
+    Parameters:
+        generator (generate_plots.PlotGenerator): Generator holding the survey data.
+
+    Returns:
+        dict: Cache keys keyed by chart name.
+    """
+    return {spec.name: render_cache.chart_key(spec) for spec in generator.collect_charts()}
+
+
+def test_touched_file_keeps_charts_fresh(generator):
+    """A CSV file with a new modification time but the same data changes no key."""
+    keys = chart_keys(generator)
+    later = time.time() + 3600
+    os.utime(os.path.join(constants.DATA_FOLDER, "export.csv"), (later, later))
+    file_utils.get_timestamp.cache_clear()
+    generator.gather_data(download=False)
+
+    assert chart_keys(generator) == keys
+
+
+def test_appended_rows_only_change_affected_charts(generator):
+    """Responses of people over 26 leave the charts of younger people fresh."""
+    keys = chart_keys(generator)
+    appended = synthetic.survey_frame(20, seed=5)
+    appended[constants.AGE_COLUMN] = constants.OVER_26
+    appended.to_csv(
+        os.path.join(constants.DATA_FOLDER, "export.csv"), mode="a", header=False, index=False
+    )
+    generator.gather_data(download=False)
+    new_keys = chart_keys(generator)
+
+    assert new_keys["support_over_26"] != keys["support_over_26"]
+    assert new_keys["participation_over_time"] != keys["participation_over_time"]
+    assert new_keys["support_under_26"] == keys["support_under_26"]
+    assert new_keys["ticket_youth_ticket_under_26"] == keys["ticket_youth_ticket_under_26"]
+
+
+def test_watch_renders_again_after_workers_crashed(generator, monkeypatch):
+    """A change that hit a broken pool is rendered by a new pool right away."""
+    pools = []
+
+    class Pool:
+        def shutdown(self):
+            """Stop the pretended workers."""
+
+    def create_pool(workers):
+        pools.append(Pool())
+        return pools[-1]
+
+    changes = iter([({}, ["export.csv"])])
+
+    def wait_for_change(*args):
+        try:
+            return next(changes)
+        except StopIteration:
+            raise KeyboardInterrupt
+
+    render_pools = []
+
+    def generate_plots(workers, skip, only, pool=None):
+        render_pools.append(pool)
+        if len(render_pools) == 2:
+            raise BrokenProcessPool("A worker died.")
+        return {}
+
+    monkeypatch.setattr(executor, "create_pool", create_pool)
+    monkeypatch.setattr(watcher, "wait_for_change", wait_for_change)
+    monkeypatch.setattr(generator, "generate_plots", generate_plots)
+    generator.watch(workers=2)
+
+    assert render_pools == [pools[0], pools[0], pools[1]]
+
+
+def test_replaced_font_changes_the_key(workspace, monkeypatch):
+    """A font file replaced at the same path makes the charts stale."""
+    font_file = workspace / "font.ttf"
+    monkeypatch.setattr(constants, "FONT_FILES", {"HEADLINE_FONTSTYLE": str(font_file)})
+    spec = charts.ChartSpec(name="pie", kind="pie", title="Pie", data=pd.Series([1, 2]))
+    font_file.write_bytes(b"regular")
+    key = render_cache.chart_key(spec)
+    font_file.write_bytes(b"regular")
+    assert render_cache.chart_key(spec) == key
+
+    font_file.write_bytes(b"bold font")
+    assert render_cache.chart_key(spec) != key
+
+
+def test_seaborn_upgrade_changes_the_key(monkeypatch):
+    """Charts drawn with another seaborn version are rendered again."""
+    spec = charts.ChartSpec(name="pie", kind="pie", title="Pie", data=pd.Series([1, 2]))
+    key = render_cache.chart_key(spec)
+    version = metadata.version
+    monkeypatch.setattr(
+        metadata, "version", lambda name: "0.0.1" if name == "seaborn" else version(name)
+    )
+
+    assert render_cache.chart_key(spec) != key
@@ -0,0 +1,104 @@
+"""Tests of the HTTP chart service."""
+# Import built-in modules
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+# Import local modules
+from scripts import charts, server
+
+# Import third-party modules
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+
+
+# Fonts of the charts, found relative to the working directory.
+FONT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fonts")
+
+
+@pytest.fixture
+def service_url(generator, workspace):
+    """Serve the charts of the synthetic export on a free port.
+
+    Yields:
+        str: Base URL of the service.
+    """
+    (workspace / "data" / "fonts").symlink_to(FONT_FOLDER, target_is_directory=True)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.ChartRequestHandler)
+    httpd.service = server.ChartService(generator)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{0}".format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url, headers=None):
+    """Request a URL, also if it answers with an error.
+
+    Parameters:
+        url (str): URL to request.
+        headers (dict, optional): Request headers.
+
+    Returns:
+        tuple: Status, headers and body of the response.
+    """
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+def test_chart_and_not_modified(service_url):
+    """A chart is rendered once and answered with 304 for its entity tag."""
+    status, headers, body = get("{0}/charts/support_over_26.png".format(service_url))
+    assert status == 200
+    assert headers["Content-Type"] == "image/png"
+    assert body.startswith(b"\x89PNG")
+
+    status, _, body = get(
+        "{0}/charts/support_over_26.png".format(service_url),
+        {"If-None-Match": headers["ETag"]},
+    )
+    assert status == 304
+    assert body == b""
+
+
+def test_subgroup_index_lists_only_drawable_charts(service_url):
+    """Charts of the other age group and about all responses are not listed."""
+    status, _, body = get("{0}/charts?subgroup=under_26".format(service_url))
+    names = [chart["name"] for chart in json.loads(body)["charts"]]
+
+    assert status == 200
+    assert "support_under_26" in names
+    assert "support_over_26" not in names
+    assert "participation_over_time" not in names
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/charts/unknown.png", 404),
+    ("/charts/support_over_26.png?subgroup=under_26", 404),
+    ("/charts/participation_over_time.png?subgroup=over_26", 404),
+    ("/unknown", 404),
+    ("/charts/support_over_26.bmp", 400),
+    ("/charts?subgroup=unknown", 400),
+])
+def test_error_status(service_url, path, status):
+    """Unknown charts answer 404, invalid formats and subgroups 400."""
+    assert get(service_url + path)[0] == status
+
+
+def test_render_failure_is_a_server_error(service_url, monkeypatch):
+    """A chart failing to render answers 500, not 400."""
+    def render(spec):
+        raise ValueError("All wedge sizes are zero")
+
+    monkeypatch.setattr(charts, "render", render)
+    assert get("{0}/charts/support_over_26.svg".format(service_url))[0] == 500
@@ -0,0 +1,32 @@
+"""Tests of the averaged and smoothed lines."""
+# Import local modules
+import constants
+from scripts import plots, smoothing
+from scripts.aggregation import DIMENSIONS, SurveyCube
+
+# Import third-party modules
+import pandas as pd
+import pytest
+
+
+def test_weighted_average_is_overall_share():
+    """Averaging the shares of both age groups by their size gives the overall share."""
+    # 4 responses over 26 and 6 under 26.
+    table = pd.DataFrame(
+        [
+            (constants.OVER_26, 2, "Yes", "Yes", "No", 3),
+            (constants.OVER_26, 5, "No", "Yes", "No", 1),
+            (constants.UNDER_26, 2, "Yes", "No", "No", 2),
+            (constants.UNDER_26, 8, "No", "No", "Yes", 4),
+        ],
+        columns=DIMENSIONS + ["count"],
+    )
+    spec = plots.plot_financial_impact(SurveyCube(table, None))[0]
+
+    average = smoothing.weighted_average(
+        spec.data, "Rating", "Age Group", spec.options["weights"]
+    )
+    # Ratings 2, 5 and 8 were given by 5, 1 and 4 of 10 people.
+    assert average.to_dict() == pytest.approx({2.0: 0.5, 5.0: 0.1, 8.0: 0.4})
+    unweighted = smoothing.weighted_average(spec.data, "Rating", "Age Group")
+    assert unweighted[2.0] == pytest.approx((3 / 4 + 2 / 6) / 2)
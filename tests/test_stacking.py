@@ -0,0 +1,28 @@
+"""Tests of the layer bounds of stacked charts."""
+# Import local modules
+from scripts import stacking
+
+# Import third-party modules
+import numpy as np
+import pandas as pd
+
+
+def test_layers_are_cumulative_sums():
+    """Layers stack in category order, a missing category counts as 0."""
+    df = pd.DataFrame({
+        "answer": ["No", "Yes", "Yes", "Don't know", "No"],
+        "rating": [1, 1, 2, 2, 3],
+        "share": [0.25, 0.75, 0.5, 0.5, 1.0],
+    })
+
+    x_data, bounds = stacking.stack_layers(
+        df, "answer", ["Yes", "No", "Don't know"], "rating", "share"
+    )
+
+    np.testing.assert_array_equal(x_data, [1, 2, 3])
+    np.testing.assert_allclose(bounds, [
+        [0, 0, 0],
+        [0.75, 0.5, 0],
+        [1.0, 0.5, 1.0],
+        [1.0, 1.0, 1.0],
+    ])
@@ -0,0 +1,315 @@
+"""Benchmark the plotting pipeline on synthetic survey data."""
+# Import built-in modules
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import local modules
+import constants
+from generate_plots import PLOT_FUNCTIONS
+from scripts import aggregation, charts, data_export, export, file_utils, synthetic
+
+# Import third-party modules
+import matplotlib
+
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+RESULTS_FOLDER = "benchmarks"
+FONTS_FOLDER = "data/fonts"
+# Modules only the drawing of charts should load.
+HEAVY_MODULES = [
+    "matplotlib",
+    "matplotlib.font_manager",
+    "matplotlib.pyplot",
+    "seaborn",
+    "scipy",
+]
+_STARTUP_SCRIPT = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import generate_plots\n"
+    "print(json.dumps([time.perf_counter() - start, "
+    "[name for name in {0!r} if name in sys.modules]]))"
+)
+
+
+def _timed(function, *args, repeat=1, **kwargs):
+    """Call a function several times and measure it.
+
+    Parameters:
+        function (callable): Function to call.
+        *args: Positional arguments of the function.
+        repeat (int, optional): Number of calls. Defaults to 1.
+        **kwargs: Keyword arguments of the function.
+
+    Returns:
+        tuple: Result of the last call and the durations in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        durations.append(time.perf_counter() - start)
+    return result, durations
+
+
+def _summary(durations):
+    """Summarize the durations of a stage.
+
+    Parameters:
+        durations (list): Durations in seconds.
+
+    Returns:
+        dict: Fastest, median and all durations.
+    """
+    return {
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "runs": durations,
+    }
+
+
+def _git_commit():
+    """Look up the commit the benchmark runs on.
+
+    Returns:
+        str: Abbreviated commit hash, None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_startup(repeat=1):
+    """Measure how long importing `generate_plots` takes in a fresh interpreter.
+
+    Parameters:
+        repeat (int, optional): Number of interpreters started. Defaults to 1.
+
+    Returns:
+        dict: Import durations and the heavy modules the import loaded.
+    """
+    durations = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT.format(HEAVY_MODULES)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        duration, loaded_modules = json.loads(output.splitlines()[-1])
+        durations.append(duration)
+    return {**_summary(durations), "heavy_modules": loaded_modules}
+
+
+def benchmark_size(rows, repeat=1, render=True, seed=0):
+    """Benchmark every stage on one synthetic data set.
+
+    Must be called inside an empty working directory, the data and plots are
+    written to the relative folders in `constants`.
+
+    Parameters:
+        rows (int): Number of survey responses.
+        repeat (int, optional): Measurements per stage. Defaults to 1.
+        render (bool, optional): Also render and save every chart.
+        seed (int, optional): Seed of the synthetic data. Defaults to 0.
+
+    Returns:
+        dict: Durations per stage, plot function and chart.
+    """
+    csv_file = os.path.join(constants.DATA_FOLDER, "synthetic.csv")
+    _, durations = _timed(synthetic.write_survey_csv, csv_file, rows, seed)
+    stages = {"generate": _summary(durations)}
+    logging.info("Benchmarking {0} rows".format(rows))
+
+    csv_data, durations = _timed(
+        file_utils.concat_from_folder, use_cache=False, repeat=repeat
+    )
+    stages["ingestion"] = _summary(durations)
+    if constants.DATA_CACHE and file_utils.feather is not None:
+        # The first call fills the cache, only reading it is measured.
+        file_utils.concat_from_folder(use_cache=True)
+        _, durations = _timed(file_utils.concat_from_folder, use_cache=True, repeat=repeat)
+        stages["ingestion_cached"] = _summary(durations)
+
+    translated, durations = _timed(
+        lambda: file_utils.replace_ger_eng(csv_data.copy()), repeat=repeat
+    )
+    stages["translation"] = _summary(durations)
+    _, durations = _timed(
+        file_utils.convert_timestamps,
+        translated[constants.TIMESTAMP_COLUMN],
+        repeat=repeat,
+    )
+    stages["timestamp_parsing"] = _summary(durations)
+    cube, durations = _timed(
+        aggregation.SurveyCube.from_frame, translated, repeat=repeat
+    )
+    stages["aggregation"] = _summary(durations)
+
+    analysis = {}
+    specs = []
+    for plot_function in PLOT_FUNCTIONS:
+        function_specs, durations = _timed(plot_function, cube, repeat=repeat)
+        analysis[plot_function.__name__] = _summary(durations)
+        specs.extend(function_specs)
+    specs = charts.deduplicate(specs)
+    _, durations = _timed(
+        data_export.export_data, specs, data_export.FORMATS, repeat=repeat
+    )
+    stages["data_export"] = _summary(durations)
+
+    rendering = {}
+    if render:
+        file_utils.prepare_plot_folder()
+        for spec in specs:
+            try:
+                _, durations = _timed(
+                    lambda: (charts.render(spec), export.flush()), repeat=repeat
+                )
+            except Exception as error:  # noqa: B902 A failing chart must not stop the others
+                logging.error("Chart {0} failed: {1}".format(spec.name, error))
+                continue
+            rendering[spec.name] = _summary(durations)
+    return {
+        "rows": rows,
+        "stages": stages,
+        "analysis": analysis,
+        "rendering": rendering,
+    }
+
+
+def run_benchmarks(sizes=None, repeat=1, render=True, seed=0):
+    """Benchmark all data set sizes in a temporary working directory.
+
+    Must be called from the repository root, like `generate_plots.py`.
+
+    Parameters:
+        sizes (list, optional): Numbers of survey responses.
+                                Defaults to `DEFAULT_SIZES`.
+        repeat (int, optional): Measurements per stage. Defaults to 1.
+        render (bool, optional): Also render and save every chart.
+        seed (int, optional): Seed of the synthetic data. Defaults to 0.
+
+    Returns:
+        dict: Environment and results per size.
+    """
+    startup = measure_startup(repeat)
+    logging.info("Importing generate_plots took {0:.3f}s".format(startup["min"]))
+    if startup["heavy_modules"]:
+        logging.warning("Startup loaded {0}".format(", ".join(startup["heavy_modules"])))
+    matplotlib.use("Agg")
+    results = []
+    working_directory = os.getcwd()
+    students = constants.STUDENTS
+    for rows in sizes or DEFAULT_SIZES:
+        with tempfile.TemporaryDirectory(prefix="vs_csv_plotter_benchmark_") as folder:
+            # The fonts in constants are relative to the working directory.
+            shutil.copytree(FONTS_FOLDER, os.path.join(folder, FONTS_FOLDER))
+            os.chdir(folder)
+            # The participation chart needs more students than responses.
+            constants.STUDENTS = max(students, rows)
+            try:
+                results.append(benchmark_size(rows, repeat, render, seed))
+            finally:
+                os.chdir(working_directory)
+                constants.STUDENTS = students
+                file_utils.get_timestamp.cache_clear()
+    return {
+        "version": constants.VERSION,
+        "commit": _git_commit(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "matplotlib": matplotlib.__version__,
+        "repeat": repeat,
+        "seed": seed,
+        "startup": startup,
+        "results": results,
+    }
+
+
+def _flatten(report):
+    """Map every measured name to its fastest duration.
+
+    Parameters:
+        report (dict): Report of `run_benchmarks`.
+
+    Returns:
+        dict: Fastest duration keyed by (rows, group, name), rows is 0 for
+              the startup.
+    """
+    durations = {}
+    if "startup" in report:
+        durations[(0, "startup", "import generate_plots")] = report["startup"]["min"]
+    for result in report["results"]:
+        for group in ("stages", "analysis", "rendering"):
+            for name, summary in result[group].items():
+                durations[(result["rows"], group, name)] = summary["min"]
+    return durations
+
+
+def compare(report, baseline):
+    """Log the change of every measurement against an older report.
+
+    Parameters:
+        report (dict): Report of this run.
+        baseline (dict): Report to compare with.
+    """
+    baseline_durations = _flatten(baseline)
+    for key, duration in _flatten(report).items():
+        if key not in baseline_durations:
+            continue
+        before = baseline_durations[key]
+        logging.info("{0} rows {1} {2}: {3:.4f}s -> {4:.4f}s ({5:+.1%})".format(
+            *key, before, duration, duration / before - 1 if before else 0,
+        ))
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+        help="numbers of synthetic survey responses",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="measurements per stage")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data")
+    parser.add_argument("--no-render", action="store_true", help="skip rendering charts")
+    parser.add_argument("--output", help="path of the JSON result file")
+    parser.add_argument("--compare", help="JSON result file of an earlier run")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.repeat, not args.no_render, args.seed)
+    output = args.output or os.path.join(RESULTS_FOLDER, "{0}_{1}.json".format(
+        datetime.datetime.now().strftime("%Y%m%d-%H%M%S"), report["commit"] or "local",
+    ))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    logging.info("Saved {0}".format(output))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            compare(report, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
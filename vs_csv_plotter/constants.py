@@ -1,5 +1,6 @@
 """Constants used by csv_plotter"""
-from matplotlib.font_manager import FontProperties
+
+VERSION = "0.1.0"
 
 # File settings
 DATA_FOLDER = "data/csv"
@@ -8,27 +9,159 @@ CSV_DOWNLOAD_LIST = [
     "https://cloud.vs-hdm.de/ocs/v2.php/apps/forms/api/v1.1/submissions/export/mLZLNgcYGBwR8JJg",
     "https://cloud.vs-hdm.de/ocs/v2.php/apps/forms/api/v1.1/submissions/export/G6fDXyzcQFZX2nSG"
 ]
+# Any matplotlib file type, "svgz" writes gzip compressed SVG files.
 PLOT_FILETYPE_LIST=["svg", "png"]
+# Data behind every chart written next to the plots: "json", "csv" and
+# "parquet" (needs pyarrow), e.g. plot/csv/<title>.csv.
+DATA_EXPORT_FORMATS = []
+# Downloads
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_TIMEOUT = 20
+# Bytes written per chunk while streaming a download to disk.
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# ETag and Last-Modified of downloaded files, kept outside DATA_FOLDER.
+DOWNLOAD_STATE_FILE = "data/download_state.json"
+# Attempts per download, waiting DOWNLOAD_BACKOFF * 2 ** attempt seconds in between.
+DOWNLOAD_MAX_ATTEMPTS = 3
+DOWNLOAD_BACKOFF = 1
+
+# Credentials
+# Sources tried in order: "env", "netrc", "file" and "prompt" (only with a terminal).
+CREDENTIAL_SOURCES = ["env", "netrc", "file", "prompt"]
+CREDENTIAL_ENV_USERNAME = "VS_CLOUD_USERNAME"
+CREDENTIAL_ENV_PASSWORD = "VS_CLOUD_PASSWORD"
+CREDENTIALS_FILE = "~/.vs_csv_plotter/credentials.json"
+# Skip downloads and use the CSV files in DATA_FOLDER, also set by the variable.
+OFFLINE = False
+CREDENTIAL_ENV_OFFLINE = "VS_CSV_PLOTTER_OFFLINE"
+# Ingestion
+# "frame" loads all CSV files into one DataFrame, "stream" aggregates them
+# chunk by chunk without ever holding the combined data and "incremental"
+# only aggregates rows appended since the last run. "partitioned" keeps one
+# aggregate per source export and submission period and only loads the
+# partitions matching PARTITIONS.
+INGESTION_MODE = "frame"
+INGESTION_CHUNK_SIZE = 100000
+# pandas frequency the submission times are counted per, keeps the timeline
+# of the aggregates independent of the number of responses.
+TIMELINE_RESOLUTION = "min"
+INCREMENTAL_STATE_FILE = "data/cache/incremental_state.pkl"
+# Aggregates and manifest of the partitioned dataset.
+PARTITION_FOLDER = "data/cache/partitions"
+# pandas period alias of a partition, e.g. "M" per month, "Q" per quarter or
+# "W" per week, which is named by its first day.
+PARTITION_PERIOD = "M"
+# Glob patterns of "<source export ID>/<period>" partitions the charts are
+# drawn from, e.g. ["*/2023-10"], None uses all partitions.
+PARTITIONS = None
+# Cache of parsed CSV files, needs pyarrow.
+DATA_CACHE = True
+DATA_CACHE_FOLDER = "data/cache"
 
 # Data
 STUDENTS = 5500
 
+# Survey columns
+TIMESTAMP_COLUMN = "Zeitstempel"
+AGE_COLUMN = "Altersklasse"
+RATING_COLUMN = (
+    "Wie stark würde dich das vollsolidarische bundesweite Semesterticket "
+    + "finanziell treffen? (Skala 1 (kein/kleines Problem) - 10 (nicht finanzierbar))"
+)
+SUPPORT_COLUMN = "Würdest du ein vollsolidarisches Deutschlandticket unterstützen?"
+YOUTH_TICKET_COLUMN = (
+    "Beziehst du aktuell das Jugendticket BW / "
+    + "Würdest du das Jugendticket BW beziehen wenn du berechtigt wärst?"
+)
+D_TICKET_COLUMN = "Beziehst du aktuell das Deutschlandticket (49 € Ticket)?"
+OVER_26 = "> 26"
+UNDER_26 = "≤ 26"
+
 # Default Settings
 SAVE_PLOT = True
 SHOW_PLOT = False
 PLOTHEIGHT = 27
 PLOTWIDTH = 17
+# Keep one styled figure per chart kind and process instead of creating one
+# per chart. Not used while SHOW_PLOT is set.
+REUSE_FIGURES = True
+
+# Rendering
+# Number of worker processes used to render charts, None uses all cores and
+# 1 renders sequentially in the current process.
+PLOT_WORKERS = None
+# Skip charts whose saved output already matches their data and style.
+RENDER_CACHE = True
+# Threads encoding and writing exported files in the background.
+EXPORT_THREADS = 2
+# Export settings per chart kind, kinds without entry use "default".
+# rasterize: draw filled areas and other collections as images in vector files.
+# dpi: resolution per file type, raster files and rasterized areas use it.
+# svg_fonttype: "path" embeds glyph outlines, "none" keeps text as text.
+# pdf_fonttype: 3 or 42, the latter embeds subsetted TrueType fonts.
+EXPORT_POLICIES = {
+    "default": {
+        "rasterize": False,
+        "dpi": {},
+        "svg_fonttype": "path",
+        "pdf_fonttype": 3,
+    },
+    # Charts with many points can be embedded as images into vector files, e.g.
+    # "stack": {"rasterize": True, "dpi": {"svg": 150, "svgz": 150, "pdf": 150}},
+}
+RENDER_CACHE_FILE = "{0}/.render_cache.json".format(PLOT_FOLDER)
+# Smoother of the average line in line_with_mean: "spline", "kde" or "lowess",
+# evaluated at SMOOTHING_POINTS positions.
+SMOOTHER = "spline"
+SMOOTHING_POINTS = 300
+# Statistics
+# Show confidence intervals on the support pie and stack charts, computed
+# with the "wilson" score interval or a multinomial "bootstrap".
+CONFIDENCE_INTERVALS = False
+CONFIDENCE_METHOD = "wilson"
+CONFIDENCE_LEVEL = 0.95
+BOOTSTRAP_RESAMPLES = 2000
+# Seed for reproducible bootstrap intervals, None draws a fresh one per run.
+BOOTSTRAP_SEED = 0
+# Worker processes drawing the resamples, worth it for large resample counts.
+BOOTSTRAP_WORKERS = 1
+# Watch mode polls DATA_FOLDER every WATCH_INTERVAL seconds and renders once
+# the files have not changed for WATCH_DEBOUNCE seconds.
+WATCH_INTERVAL = 1.0
+WATCH_DEBOUNCE = 2.0
+
+# Chart service
+# Address of the HTTP service started with --serve.
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8000
+# Bytes of rendered charts kept in memory, the least recently used are dropped.
+SERVER_CACHE_BYTES = 64 * 1024 * 1024
+# Subgroups a chart can be filtered to with ?subgroup=<name>: the responses
+# with the value in the column, the label is appended to the chart title.
+SERVER_SUBGROUPS = {
+    "over_26": {"column": AGE_COLUMN, "value": OVER_26, "label": "(>26)"},
+    "under_26": {"column": AGE_COLUMN, "value": UNDER_26, "label": "(≤26)"},
+    "d_ticket": {"column": D_TICKET_COLUMN, "value": "Yes", "label": "(Deutschlandticket)"},
+    "no_d_ticket": {"column": D_TICKET_COLUMN, "value": "No", "label": "(no Deutschlandticket)"},
+}
+
+# Profiling
+# Record the duration of every stage and chart and write a run report.
+PROFILE = False
+# Also trace the peak memory per stage, this slows the run down noticeably.
+PROFILE_MEMORY = False
+PROFILE_FOLDER = "report"
+# "json" and "csv" reports and a "trace" for chrome://tracing or Perfetto.
+PROFILE_FORMATS = ["json", "csv", "trace"]
 
 # Style settings
-HEADLINE_FONTSTYLE = FontProperties(
-    fname="data/fonts/futura/Futura Bold font.ttf"
-)
-STANDART_FONTSTYLE = FontProperties(
-    fname="data/fonts/futura/Futura Book font.ttf"
-)
-FOOTNOTE_FONTSTYLE = FontProperties(
-    fname="data/fonts/futura/Futura Light Italic font.ttf"
-)
+# Font files, loaded as FontProperties by the *_FONTSTYLE names on first use,
+# so importing constants does not load matplotlib.
+FONT_FILES = {
+    "HEADLINE_FONTSTYLE": "data/fonts/futura/Futura Bold font.ttf",
+    "STANDART_FONTSTYLE": "data/fonts/futura/Futura Book font.ttf",
+    "FOOTNOTE_FONTSTYLE": "data/fonts/futura/Futura Light Italic font.ttf",
+}
 
 CUSTOM_COLORS = [
     "#FEED00",
@@ -39,17 +172,46 @@ TEXTCOLOR = "white"
 BACKGROUNDCOLOR = "black"
 
 
-HEADLINE_FONT = {
-    "fontsize": 50,
-    "weight": "bold",
-    "fontproperties": HEADLINE_FONTSTYLE
-}
-DESCRIPTION_FONT = {
-    "fontsize": 30,
-    "fontproperties": STANDART_FONTSTYLE
-}
-FOOTNOTE_FONT = {
-    "fontsize": 16,
-    "color": "gray",
-    "fontproperties": FOOTNOTE_FONTSTYLE
+# Text styles, available as HEADLINE_FONT etc. with the FontProperties of the
+# named font style filled in.
+FONT_STYLES = {
+    "HEADLINE_FONT": {
+        "fontsize": 50,
+        "weight": "bold",
+        "fontproperties": "HEADLINE_FONTSTYLE"
+    },
+    "DESCRIPTION_FONT": {
+        "fontsize": 30,
+        "fontproperties": "STANDART_FONTSTYLE"
+    },
+    "FOOTNOTE_FONT": {
+        "fontsize": 16,
+        "color": "gray",
+        "fontproperties": "FOOTNOTE_FONTSTYLE"
+    },
 }
+
+
+def __getattr__(name):
+    """Build the font constants on first access.
+
+    Parameters:
+        name (str): Name of the constant.
+
+    Raises:
+        AttributeError: If the constant does not exist.
+
+    Returns:
+        FontProperties | dict: Font style or text style.
+    """
+    if name in FONT_FILES:
+        from matplotlib.font_manager import FontProperties  # noqa: WPS433 Loaded lazily
+
+        value = FontProperties(fname=FONT_FILES[name])
+    elif name in FONT_STYLES:
+        style = FONT_STYLES[name]
+        value = {**style, "fontproperties": __getattr__(style["fontproperties"])}
+    else:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+    globals()[name] = value
+    return value
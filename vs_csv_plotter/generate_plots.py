@@ -1,29 +1,416 @@
 """Generate Plots."""
+# Import built-in modules
+import argparse
+import dataclasses
+import logging
+import sys
+import time
+import traceback
+from concurrent.futures.process import BrokenProcessPool
+
 # Import local modules
-from scripts import file_utils, plots
+import constants
+from scripts import (
+    aggregation,
+    charts,
+    data_export,
+    executor,
+    file_utils,
+    incremental,
+    partitions,
+    plots,
+    profiling,
+    render_cache,
+    server,
+    watcher,
+)
+
+# Functions turning the aggregated survey data into ChartSpecs, in plotting order.
+PLOT_FUNCTIONS = [
+    plots.plot_participation,
+    plots.plot_age_distribution,
+    plots.plot_ticket_data,
+    plots.plot_support_data,
+    plots.plot_financial_impact,
+    plots.plot_support_data_vs_financial_impact,
+    plots.plot_participation_over_time,
+]
+# Plot functions about all responses, e.g. compared to all students or over
+# time, which are left out when the charts of a subgroup are collected.
+WHOLE_SURVEY_PLOT_FUNCTIONS = [
+    plots.plot_participation,
+    plots.plot_participation_over_time,
+]
+# Functions turning the aggregates per (source export, period) into ChartSpecs,
+# only used in "partitioned" ingestion mode.
+PARTITION_PLOT_FUNCTIONS = [
+    plots.plot_support_by_period,
+]
+
 
 class PlotGenerator:
     """Generates Plots-"""
-    def __init__(self):
-        self.gather_data()
+    def __init__(
+        self, ingestion_mode=constants.INGESTION_MODE, profile=constants.PROFILE, download=True,
+    ):
+        self.ingestion_mode = ingestion_mode
+        # Aggregates keyed by (source export, period) in "partitioned" mode.
+        self.partitions = {}
+        self.analysis_errors = {}
+        # Name of the plot function that created each chart.
+        self.chart_groups = {}
+        if profile:
+            profiling.enable(memory=constants.PROFILE_MEMORY)
+        self.gather_data(download)
         file_utils.prepare_plot_folder()
 
-    def gather_data(self):
-        """Gather Data from CSV Folder."""
-        file_utils.download_csv_data()
-        self.combined_data = file_utils.replace_ger_eng(file_utils.concat_from_folder())
+    def gather_data(self, download=True):
+        """Gather Data from CSV Folder.
+
+        In "stream" ingestion mode the CSV files are aggregated chunk by chunk,
+        in "incremental" mode only rows appended since the last run are
+        aggregated and in "partitioned" mode the aggregates of the partitions
+        matching constants.PARTITIONS are combined. In these modes
+        `combined_data` stays None.
+
+        Parameters:
+            download (bool, optional): Download the CSV files first.
+        """
+        if download:
+            with profiling.stage("download"):
+                file_utils.download_csv_data()
+        if self.ingestion_mode == "stream":
+            self.combined_data = None
+            with profiling.stage("SurveyCube.from_folder"):
+                self.cube = aggregation.SurveyCube.from_folder()
+            return
+        if self.ingestion_mode == "partitioned":
+            self.combined_data = None
+            with profiling.stage("partitions.load"):
+                self.partitions = partitions.load(constants.PARTITIONS)
+                self.cube = partitions.combine(self.partitions)
+            return
+        if self.ingestion_mode == "incremental":
+            self.combined_data = None
+            with profiling.stage("incremental.update_cube"):
+                self.cube = incremental.update_cube()
+            return
+        with profiling.stage("concat_from_folder"):
+            csv_data = file_utils.concat_from_folder()
+        with profiling.stage("replace_ger_eng"):
+            self.combined_data = file_utils.replace_ger_eng(csv_data)
+        with profiling.stage("SurveyCube.from_frame"):
+            self.cube = aggregation.SurveyCube.from_frame(self.combined_data)
+
+    def collect_charts(self, skip=None, only=None, cube=None):
+        """Collect the specifications of all charts without drawing them.
+
+        A failing analysis is logged and stored in `analysis_errors`, the
+        charts of the remaining plot functions are still collected.
+
+        Parameters:
+            skip (list, optional): Glob patterns of chart names to leave out.
+            only (list, optional): Glob patterns of chart names to keep,
+                                   None keeps all charts.
+            cube (aggregation.SurveyCube, optional): Data to analyse, e.g. a
+                                                     subgroup. Defaults to
+                                                     the gathered data, the
+                                                     charts of
+                                                     WHOLE_SURVEY_PLOT_FUNCTIONS
+                                                     are only drawn for it.
+
+        Returns:
+            list: Unique ChartSpecs in plotting order.
+        """
+        specs = []
+        self.analysis_errors = {}
+        jobs = [
+            (plot_function, self.cube if cube is None else cube)
+            for plot_function in PLOT_FUNCTIONS
+            if cube is None or plot_function not in WHOLE_SURVEY_PLOT_FUNCTIONS
+        ]
+        if self.partitions and cube is None:
+            jobs.extend(
+                (plot_function, self.partitions) for plot_function in PARTITION_PLOT_FUNCTIONS
+            )
+        for plot_function, data in jobs:
+            try:
+                with profiling.stage(plot_function.__name__, "analysis"):
+                    function_specs = plot_function(data)
+            except Exception:  # noqa: B902 A failing analysis must not stop the others
+                error = traceback.format_exc()
+                logging.error("{0} failed:\n{1}".format(plot_function.__name__, error))
+                self.analysis_errors[plot_function.__name__] = error
+                continue
+            for spec in function_specs:
+                self.chart_groups.setdefault(spec.name, plot_function.__name__)
+            specs.extend(function_specs)
+        # Subgroups have no timeline, the footnote shows the newest response.
+        timestamp = self.cube.last_submission()
+        specs = [dataclasses.replace(spec, timestamp=timestamp) for spec in charts.deduplicate(specs)]
+        if only:
+            specs = charts.select(specs, only)
+        if skip:
+            specs = charts.skip(specs, skip)
+        return specs
+
+    def stale_charts(self, specs):
+        """Check which charts would be rendered, without rendering them.
+
+        Parameters:
+            specs (list): ChartSpecs to check.
+
+        Returns:
+            list: ChartSpecs whose saved output is missing or outdated.
+        """
+        manifest = render_cache.load()
+        return [
+            spec for spec in specs
+            if not render_cache.is_current(spec, render_cache.chart_key(spec), manifest)
+        ]
+
+    def generate_plots(
+        self,
+        workers=constants.PLOT_WORKERS,
+        skip=None,
+        only=None,
+        use_cache=constants.RENDER_CACHE,
+        pool=None,
+        data_formats=None,
+        render=True,
+    ):
+        """Generate Plots.
+
+        Parameters:
+            workers (int, optional): Number of worker processes, None uses all
+                                     cores and 1 renders sequentially.
+                                     Defaults to constants.PLOT_WORKERS.
+            skip (list, optional): Glob patterns of chart names to leave out.
+            only (list, optional): Glob patterns of chart names to render,
+                                   None renders all charts.
+            use_cache (bool, optional): Skip charts with current output.
+                                        Defaults to constants.RENDER_CACHE.
+            pool (ProcessPoolExecutor, optional): Running render workers to use.
+            data_formats (list, optional): Formats the data of every chart is
+                                           written in. Defaults to
+                                           constants.DATA_EXPORT_FORMATS.
+            render (bool, optional): Draw the charts, False only writes
+                                     their data without loading matplotlib.
+
+        Returns:
+            dict: Tracebacks of failed plot functions and charts keyed by name.
+        """
+        specs = self.collect_charts(skip, only)
+        failed = dict(self.analysis_errors)
+        data_formats = constants.DATA_EXPORT_FORMATS if data_formats is None else data_formats
+        if data_formats:
+            with profiling.stage("export_data"):
+                data_export.export_data(specs, data_formats)
+        if render:
+            with profiling.stage("run_jobs"):
+                failed.update(executor.run_jobs(specs, workers, use_cache, pool))
+        if profiling.is_enabled():
+            self.write_profile_report()
+        return failed
+
+    def watch(
+        self,
+        workers=constants.PLOT_WORKERS,
+        skip=None,
+        only=None,
+        interval=constants.WATCH_INTERVAL,
+        debounce=constants.WATCH_DEBOUNCE,
+    ):
+        """Render the charts again whenever the CSV files change, until interrupted.
+
+        The interpreter, the render workers with their loaded fonts and styled
+        figures and the ingestion caches stay alive between updates. Files are
+        not downloaded, the data is ingested again from `constants.DATA_FOLDER`
+        and only charts whose data changed are rendered. If the render workers
+        crash, the update is rendered again by new ones.
+
+        Parameters:
+            workers (int, optional): Number of worker processes, None uses all
+                                     cores and 1 renders sequentially.
+                                     Defaults to constants.PLOT_WORKERS.
+            skip (list, optional): Glob patterns of chart names to leave out.
+            only (list, optional): Glob patterns of chart names to render.
+            interval (float, optional): Seconds between two polls.
+                                        Defaults to constants.WATCH_INTERVAL.
+            debounce (float, optional): Seconds without changes before rendering.
+                                        Defaults to constants.WATCH_DEBOUNCE.
+        """
+        pool = None if workers == 1 else executor.create_pool(workers)
+        files = watcher.snapshot(constants.DATA_FOLDER)
+        try:
+            self.generate_plots(workers, skip, only, pool=pool)
+            while True:
+                logging.info("Watching {0} for changes".format(constants.DATA_FOLDER))
+                files, changed = watcher.wait_for_change(
+                    constants.DATA_FOLDER, files, interval, debounce
+                )
+                logging.info("Changed {0}".format(", ".join(changed)))
+                start = time.perf_counter()
+                file_utils.get_timestamp.cache_clear()
+                try:
+                    self.gather_data(download=False)
+                    try:
+                        self.generate_plots(workers, skip, only, pool=pool)
+                    except BrokenProcessPool:
+                        logging.error("Render workers crashed, starting new ones")
+                        pool.shutdown()
+                        pool = executor.create_pool(workers)
+                        self.generate_plots(workers, skip, only, pool=pool)
+                except Exception:  # noqa: B902 A broken export must not stop watching
+                    logging.error("Update failed:\n{0}".format(traceback.format_exc()))
+                    continue
+                logging.info("Updated plots in {0:.1f}s".format(time.perf_counter() - start))
+        except KeyboardInterrupt:
+            logging.info("Stopped watching")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def write_profile_report(self, folder_path=constants.PROFILE_FOLDER, formats=None):
+        """Write the stages recorded by the profiler.
+
+        Parameters:
+            folder_path (str, optional): Folder the reports are written to.
+                                         Defaults to constants.PROFILE_FOLDER.
+            formats (list, optional): Report formats.
+                                      Defaults to constants.PROFILE_FORMATS.
+
+        Returns:
+            list: Paths of the written files.
+        """
+        return profiling.write_report(folder_path, formats or constants.PROFILE_FORMATS)
+
+
+def parse_args(argv=None):
+    """Parse the command line.
+
+    Parameters:
+        argv (list, optional): Arguments without the program name.
+                               Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Generate plots from the survey CSV files.")
+    parser.add_argument(
+        "charts", nargs="*", metavar="CHART",
+        help="glob patterns of chart names to render, e.g. 'support_*', default all",
+    )
+    parser.add_argument(
+        "--skip", action="append", default=[], metavar="PATTERN",
+        help="glob pattern of chart names to leave out, can be repeated",
+    )
+    parser.add_argument("--list", action="store_true", help="list the selected charts and exit")
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="report which selected charts are stale without rendering them",
+    )
+    parser.add_argument(
+        "--formats", nargs="+", metavar="FORMAT",
+        help="file types to save instead of PLOT_FILETYPE_LIST, e.g. svg png pdf",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="render even if the output is current",
+    )
+    parser.add_argument(
+        "--data", nargs="+", choices=data_export.FORMATS, metavar="FORMAT",
+        help="also write the data of every chart as json, csv or parquet",
+    )
+    parser.add_argument(
+        "--data-only", action="store_true",
+        help="only write the data of every chart, without drawing it",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=constants.PLOT_WORKERS,
+        help="worker processes, 1 renders sequentially, default all cores",
+    )
+    parser.add_argument(
+        "--ingestion-mode", choices=["frame", "stream", "incremental", "partitioned"],
+        default=constants.INGESTION_MODE,
+    )
+    parser.add_argument(
+        "--partitions", nargs="+", metavar="PATTERN",
+        help="partitions to draw from in partitioned mode, e.g. '*/2023-10', default all",
+    )
+    parser.add_argument(
+        "--offline", action="store_true", help="use the CSV files without downloading",
+    )
+    parser.add_argument("--profile", action="store_true", help="write a run report")
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running and render again whenever the CSV files change",
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="render the selected charts on request over HTTP instead of saving them",
+    )
+    parser.add_argument(
+        "--port", type=int, default=constants.SERVER_PORT,
+        help="port of the chart service, default %(default)s",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the plot generator from the command line.
+
+    Parameters:
+        argv (list, optional): Arguments without the program name.
+                               Defaults to sys.argv[1:].
 
-    def generate_plots(self):
-        """Generate Plots"""
-        plots.plot_participation(self.combined_data)
-        plots.plot_age_distribution(self.combined_data)
-        plots.plot_ticket_data(self.combined_data)
-        plots.plot_support_data(self.combined_data)
-        plots.plot_financial_impact(self.combined_data)
-        plots.plot_support_data_vs_financial_impact(self.combined_data)
-        plots.plot_participation_over_time(self.combined_data)
+    Returns:
+        int: Exit code, 1 if any chart failed.
+    """
+    args = parse_args(argv)
+    if args.formats:
+        constants.PLOT_FILETYPE_LIST = args.formats
+    if args.offline:
+        constants.OFFLINE = True
+    if args.partitions:
+        constants.PARTITIONS = args.partitions
+    # Listing and checking charts works with the CSV files already downloaded.
+    plot_generator = PlotGenerator(
+        args.ingestion_mode,
+        args.profile or constants.PROFILE,
+        download=not (args.list or args.dry_run),
+    )
+    if args.list or args.dry_run:
+        specs = plot_generator.collect_charts(args.skip, args.charts)
+        stale_names = {
+            spec.name for spec in plot_generator.stale_charts(specs)
+        } if args.dry_run else set()
+        for spec in specs:
+            columns = [spec.name, spec.kind, plot_generator.chart_groups[spec.name], spec.title]
+            if args.dry_run:
+                columns.insert(1, "stale" if spec.name in stale_names else "current")
+            print("\t".join(columns))
+        if args.dry_run:
+            print("{0} of {1} charts are stale".format(len(stale_names), len(specs)))
+        return 1 if plot_generator.analysis_errors else 0
+    if args.serve:
+        server.serve(plot_generator, port=args.port, skip=args.skip, only=args.charts)
+        return 0
+    if args.watch:
+        plot_generator.watch(args.workers, args.skip, args.charts)
+        return 0
+    data_formats = args.data
+    if args.data_only and not (data_formats or constants.DATA_EXPORT_FORMATS):
+        data_formats = data_export.FORMATS
+    failed = plot_generator.generate_plots(
+        args.workers,
+        args.skip,
+        args.charts,
+        use_cache=not args.force,
+        data_formats=data_formats,
+        render=not args.data_only,
+    )
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
-    plot_generator = PlotGenerator()
-    plot_generator.generate_plots()
+    sys.exit(main())
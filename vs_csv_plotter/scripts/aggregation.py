@@ -0,0 +1,177 @@
+"""Single-pass aggregation of survey data shared by all plots."""
+# Import local modules
+import constants
+from scripts import file_utils
+
+# Import third-party modules
+import pandas as pd
+
+
+# Columns every count is grouped by.
+DIMENSIONS = [
+    constants.AGE_COLUMN,
+    constants.RATING_COLUMN,
+    constants.SUPPORT_COLUMN,
+    constants.YOUTH_TICKET_COLUMN,
+    constants.D_TICKET_COLUMN,
+]
+
+
+class SurveyCube:
+    """Number of responses for every combination of answers.
+
+    The cube holds one row per observed combination of the `DIMENSIONS`
+    columns, including missing answers, and the number of responses per
+    submission minute (`constants.TIMELINE_RESOLUTION`). Every count a plot needs is a sum over this
+    table, so the survey data is only scanned once.
+    """
+
+    def __init__(self, table, timeline):
+        """Create a cube from already aggregated counts.
+
+        Parameters:
+            table (pd.DataFrame): `DIMENSIONS` columns and a "count" column.
+            timeline (pd.Series | None): Number of responses per submission
+                                         minute, None if unknown.
+        """
+        self.table = table
+        self.timeline = timeline
+
+    @classmethod
+    def from_frame(cls, csv_data):
+        """Aggregate survey data in one grouped pass.
+
+        Parameters:
+            csv_data (pd.DataFrame): DataFrame containing survey data.
+
+        Returns:
+            SurveyCube: Counts of the survey data.
+        """
+        table = csv_data.groupby(
+            DIMENSIONS, dropna=False, observed=True, sort=False
+        ).size().rename("count").reset_index()
+        # The table is small, plain labels keep the counts sorted by label.
+        for column in table.select_dtypes("category"):
+            table[column] = table[column].astype(table[column].cat.categories.dtype)
+        timeline = file_utils.convert_timestamps(
+            csv_data[constants.TIMESTAMP_COLUMN]
+        ).dt.floor(constants.TIMELINE_RESOLUTION).value_counts().sort_index()
+        return cls(table, timeline)
+
+    @classmethod
+    def from_folder(
+        cls,
+        folder_path=constants.DATA_FOLDER,
+        chunksize=constants.INGESTION_CHUNK_SIZE,
+    ):
+        """Aggregate all CSV files in a folder chunk by chunk.
+
+        Only one chunk and the running counts are held in memory. Their size
+        depends on the answer combinations and the submission minutes, not
+        on the number of rows, so merging a chunk does not get slower with
+        the rows already read.
+
+        Parameters:
+            folder_path (str, optional): Path to the folder containing CSV files.
+                                         Defaults to constants.DATA_FOLDER.
+            chunksize (int, optional): Number of rows parsed at once.
+                                       Defaults to constants.INGESTION_CHUNK_SIZE.
+
+        Returns:
+            SurveyCube: Counts of the survey data.
+        """
+        cube = None
+        for file_path in file_utils.list_csv_files(folder_path):
+            for chunk in file_utils.iter_survey_csv(file_path, chunksize):
+                chunk_cube = cls.from_frame(chunk)
+                cube = chunk_cube if cube is None else cube.merge(chunk_cube)
+        return cube
+
+    def where(self, column, predicate):
+        """Select the responses matching a condition.
+
+        Parameters:
+            column (str): Column the condition applies to.
+            predicate: Value to compare with, or a function returning a
+                       boolean mask for the column, e.g. `lambda r: r < 4`.
+
+        Returns:
+            SurveyCube: Cube with the matching responses only. Its timeline
+                        is None, the timestamps are not grouped by answers.
+        """
+        values = self.table[column]
+        mask = predicate(values) if callable(predicate) else values == predicate
+        return SurveyCube(self.table[mask.fillna(False)], None)
+
+    def last_submission(self):
+        """Find the newest submission.
+
+        Returns:
+            pd.Timestamp: Start of the newest submission minute, None if the
+                          timeline is unknown or empty.
+        """
+        if self.timeline is None or self.timeline.empty:
+            return None
+        return self.timeline.index.max()
+
+    def total(self):
+        """Count all responses.
+
+        Returns:
+            int: Number of responses.
+        """
+        return int(self.table["count"].sum())
+
+    def counts(self, *columns):
+        """Count responses per combination of answers, ignoring missing ones.
+
+        Parameters:
+            *columns (str): Columns to group by.
+
+        Returns:
+            pd.Series: Number of responses per answer, sorted by answer.
+        """
+        return self.table.groupby(
+            list(columns), observed=True
+        )["count"].sum().astype("int64")
+
+    def value_counts(self, column):
+        """Count responses per answer like `pd.Series.value_counts`.
+
+        Parameters:
+            column (str): Column to count.
+
+        Returns:
+            pd.Series: Number of responses per answer, most common first.
+        """
+        return self.counts(column).sort_values(ascending=False, kind="stable")
+
+    def mean(self, column):
+        """Average a numeric column, ignoring missing answers.
+
+        Parameters:
+            column (str): Column to average.
+
+        Returns:
+            float: Mean of the column.
+        """
+        answered = self.table[self.table[column].notna()]
+        return float(
+            (answered[column].astype("float64") * answered["count"]).sum()
+            / answered["count"].sum()
+        )
+
+    def merge(self, other):
+        """Combine the counts of two cubes.
+
+        Parameters:
+            other (SurveyCube): Cube to add.
+
+        Returns:
+            SurveyCube: Cube with the responses of both cubes.
+        """
+        table = pd.concat([self.table, other.table], ignore_index=True).groupby(
+            DIMENSIONS, dropna=False, observed=True, sort=False
+        )["count"].sum().reset_index()
+        timeline = self.timeline.add(other.timeline, fill_value=0).astype("int64")
+        return SurveyCube(table, timeline)
@@ -0,0 +1,128 @@
+"""Chart specifications and the functions rendering them."""
+# Import built-in modules
+import fnmatch
+import importlib
+from dataclasses import dataclass, field
+
+
+# Module of the drawing functions, imported by `render` as it loads pyplot,
+# seaborn and scipy.
+RENDERER_MODULE = "scripts.plot_by_diagram_type"
+# Chart kind mapped to the name of the drawing function in `RENDERER_MODULE`
+# and the name of its data parameter.
+RENDERERS = {
+    "pie": ("pie", "plot_data"),
+    "line_with_mean": ("line_with_mean", "plot_data"),
+    "line": ("plot_line_chart", "df"),
+    "stack": ("plot_stack_chart", "df"),
+}
+
+
+@dataclass
+class ChartSpec:
+    """Description of a single chart, independent of how it is drawn.
+
+    Attributes:
+        name (str): Unique, filename friendly identifier of the chart.
+        kind (str): Kind of chart, one of the keys in `RENDERERS`.
+        title (str): Title of the chart.
+        data (pd.DataFrame | pd.Series): Aggregated data to plot.
+        options (dict): Additional keyword arguments for the drawing function.
+        timestamp (pd.Timestamp): Newest submission in the survey data, shown
+                                  in the footnote. It is not part of the cache
+                                  key, so charts whose data did not change
+                                  keep their files when responses arrive.
+    """
+
+    name: str
+    kind: str
+    title: str
+    data: object
+    options: dict = field(default_factory=dict)
+    timestamp: object = None
+
+
+def render(spec):
+    """Draw and save a chart.
+
+    Parameters:
+        spec (ChartSpec): Chart to render.
+
+    Raises:
+        ValueError: If the chart kind is unknown.
+    """
+    if spec.kind not in RENDERERS:
+        raise ValueError("Unknown chart kind {0}.".format(spec.kind))
+    function_name, data_parameter = RENDERERS[spec.kind]
+    plot_function = getattr(importlib.import_module(RENDERER_MODULE), function_name)
+    plot_function(
+        **{data_parameter: spec.data}, title=spec.title, timestamp=spec.timestamp, **spec.options
+    )
+
+
+def has_data(spec):
+    """Check whether a chart has anything to draw.
+
+    Parameters:
+        spec (ChartSpec): Chart to check.
+
+    Returns:
+        bool: False if the data is empty or all slices of a pie are zero.
+    """
+    if spec.data.empty:
+        return False
+    return spec.kind != "pie" or bool(spec.data.to_numpy().any())
+
+
+def deduplicate(specs):
+    """Remove charts sharing a name, keeping the first one.
+
+    Parameters:
+        specs (list): ChartSpecs to deduplicate.
+
+    Returns:
+        list: ChartSpecs with unique names, in their original order.
+    """
+    unique_specs = {}
+    for spec in specs:
+        unique_specs.setdefault(spec.name, spec)
+    return list(unique_specs.values())
+
+
+def matches(spec, patterns):
+    """Check whether the name of a chart matches any of the given glob patterns.
+
+    Parameters:
+        spec (ChartSpec): Chart to check.
+        patterns (list): Glob patterns like "support_*".
+
+    Returns:
+        bool: True if any pattern matches.
+    """
+    return any(fnmatch.fnmatch(spec.name, pattern) for pattern in patterns)
+
+
+def select(specs, patterns):
+    """Keep only charts whose name matches any of the given glob patterns.
+
+    Parameters:
+        specs (list): ChartSpecs to filter.
+        patterns (list): Glob patterns like "support_*".
+
+    Returns:
+        list: ChartSpecs matching any pattern.
+    """
+    return [spec for spec in specs if matches(spec, patterns)]
+
+
+def skip(specs, patterns):
+    """Remove charts whose name matches any of the given glob patterns.
+
+    Parameters:
+        specs (list): ChartSpecs to filter.
+        patterns (list): Glob patterns like "support_*".
+
+    Returns:
+        list: ChartSpecs not matching any pattern.
+    """
+    return [spec for spec in specs if not matches(spec, patterns)]
@@ -0,0 +1,136 @@
+"""Credential sources for downloading CSV exports without user interaction."""
+# Import built-in modules
+import getpass
+import json
+import logging
+import netrc
+import os
+import sys
+
+# Import local modules
+import constants
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+class AuthenticationError(RuntimeError):
+    """Raised if no source provides credentials the server accepts."""
+
+
+def is_offline():
+    """Check whether downloads are disabled and cached CSV files are used.
+
+    Returns:
+        bool: True if `constants.OFFLINE` or the offline environment variable is set.
+    """
+    return constants.OFFLINE or os.environ.get(
+        constants.CREDENTIAL_ENV_OFFLINE, ""
+    ).lower() in {"1", "true", "yes"}
+
+
+def from_env(host):
+    """Read credentials from environment variables.
+
+    Parameters:
+        host (str): Host the credentials are used for.
+
+    Yields:
+        tuple: Username and password.
+    """
+    username = os.environ.get(constants.CREDENTIAL_ENV_USERNAME)
+    password = os.environ.get(constants.CREDENTIAL_ENV_PASSWORD)
+    if username and password:
+        yield username, password
+
+
+def from_netrc(host):
+    """Read credentials for the host from the user's netrc file.
+
+    Parameters:
+        host (str): Host the credentials are used for.
+
+    Yields:
+        tuple: Username and password.
+    """
+    try:
+        authenticators = netrc.netrc().authenticators(host)
+    except (FileNotFoundError, netrc.NetrcParseError) as error:
+        logging.debug("No netrc credentials: {0}".format(error))
+        return
+    if authenticators:
+        login, _, password = authenticators
+        yield login, password
+
+
+def from_file(host):
+    """Read credentials from the JSON file in `constants.CREDENTIALS_FILE`.
+
+    The file contains either {"username": ..., "password": ...} or such
+    objects keyed by host.
+
+    Parameters:
+        host (str): Host the credentials are used for.
+
+    Yields:
+        tuple: Username and password.
+    """
+    credentials_file = os.path.expanduser(constants.CREDENTIALS_FILE)
+    try:
+        with open(credentials_file, encoding="utf-8") as file:
+            credentials = json.load(file)
+    except FileNotFoundError:
+        return
+    except json.JSONDecodeError as error:
+        logging.warning("Skipping credentials file {0}: {1}".format(credentials_file, error))
+        return
+    try:
+        credentials = credentials.get(host, credentials)
+        username, password = credentials["username"], credentials["password"]
+    except (AttributeError, KeyError):
+        logging.warning("Skipping credentials file {0}, it has no username and password.".format(
+            credentials_file,
+        ))
+        return
+    if username and password:
+        yield username, password
+
+
+def from_prompt(host):
+    """Ask the user for credentials, only if a terminal is attached.
+
+    Parameters:
+        host (str): Host the credentials are used for.
+
+    Yields:
+        tuple: Username and password, asked again on every iteration.
+    """
+    if not sys.stdin.isatty():
+        return
+    while True:
+        username = input("Enter your username for {0}: ".format(host))
+        password = getpass.getpass("Enter your password: ")
+        yield username, password
+
+
+SOURCES = {
+    "env": from_env,
+    "netrc": from_netrc,
+    "file": from_file,
+    "prompt": from_prompt,
+}
+
+
+def iter_credentials(host, sources=None):
+    """Yield credentials from all configured sources in order.
+
+    Parameters:
+        host (str): Host the credentials are used for.
+        sources (list, optional): Names of the sources in `SOURCES`.
+                                  Defaults to constants.CREDENTIAL_SOURCES.
+
+    Yields:
+        tuple: Username and password.
+    """
+    for source in sources or constants.CREDENTIAL_SOURCES:
+        yield from SOURCES[source](host)
@@ -0,0 +1,126 @@
+"""Export of the aggregated data behind every chart, without drawing it."""
+# Import built-in modules
+import json
+import logging
+import os
+
+# Import local modules
+from scripts import file_utils, profiling
+
+# Import third-party modules
+import numpy as np
+import pandas as pd
+
+try:
+    from pyarrow import parquet
+except ImportError:
+    parquet = None
+
+
+logging.basicConfig(level=logging.INFO)
+
+FORMATS = ["json", "csv", "parquet"]
+
+
+def to_frame(data):
+    """Turn the data of a chart into a flat table.
+
+    Parameters:
+        data (pd.DataFrame | pd.Series): Data of a ChartSpec.
+
+    Returns:
+        pd.DataFrame: Table with the index as regular columns, except a
+                      default range index.
+    """
+    if isinstance(data, pd.Series):
+        data = data.rename(data.name or "value").to_frame()
+        data.index.name = data.index.name or "label"
+    if isinstance(data.index, pd.RangeIndex) and data.index.name is None:
+        return data.reset_index(drop=True)
+    if data.index.name is None:
+        data = data.rename_axis("label")
+    return data.reset_index()
+
+
+def _jsonable(value):
+    """Convert chart data and options into JSON serializable values.
+
+    Parameters:
+        value: Value to convert.
+
+    Returns:
+        object: Value made of dicts, lists, strings, numbers and None.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return json.loads(to_frame(value).to_json(orient="records", date_format="iso"))
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _write(data_file, spec, extension):
+    """Write the data of a chart in one format.
+
+    Parameters:
+        data_file (str): Path of the file.
+        spec (charts.ChartSpec): Chart to export.
+        extension (str): One of `FORMATS`.
+    """
+    os.makedirs(os.path.dirname(data_file), exist_ok=True)
+    tmp_file = "{0}.tmp".format(data_file)
+    if extension == "json":
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            json.dump({
+                "name": spec.name,
+                "kind": spec.kind,
+                "title": spec.title,
+                "timestamp": _jsonable(spec.timestamp),
+                "data": _jsonable(spec.data),
+                "options": _jsonable(spec.options),
+            }, file, ensure_ascii=False, separators=(",", ":"), default=str)
+    elif extension == "csv":
+        to_frame(spec.data).to_csv(tmp_file, index=False)
+    else:
+        to_frame(spec.data).to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, data_file)
+
+
+def export_data(specs, formats):
+    """Write the aggregated data of every chart next to the plots.
+
+    The files are named like the plot files, e.g. `plot/csv/<title>.csv`.
+    Nothing is drawn and matplotlib is not imported.
+
+    Parameters:
+        specs (list): ChartSpecs to export.
+        formats (list): Any of `FORMATS`, "parquet" needs pyarrow.
+
+    Raises:
+        ValueError: If a format is unknown.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    unknown_formats = [extension for extension in formats if extension not in FORMATS]
+    if unknown_formats:
+        raise ValueError("Unknown data formats {0}.".format(", ".join(unknown_formats)))
+    if "parquet" in formats and parquet is None:
+        logging.warning("pyarrow is not installed, Parquet files are not written.")
+        formats = [extension for extension in formats if extension != "parquet"]
+    written_files = []
+    for spec in specs:
+        with profiling.stage(spec.name, "data"):
+            for extension in formats:
+                data_file = file_utils.plot_file_path(spec.title, extension)
+                _write(data_file, spec, extension)
+                written_files.append(data_file)
+    logging.info("Saved the data of {0} charts as {1}".format(len(specs), ", ".join(formats)))
+    return written_files
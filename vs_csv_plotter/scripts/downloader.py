@@ -0,0 +1,189 @@
+"""Functions for downloading CSV exports concurrently and incrementally."""
+# Import built-in modules
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Import local modules
+import constants
+
+# Import third-party modules
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logging.basicConfig(level=logging.INFO)
+
+DOWNLOADED = "downloaded"
+NOT_MODIFIED = "not modified"
+UNAUTHORIZED = "unauthorized"
+FAILED = "failed"
+
+
+def create_session(username, password, pool_size=constants.DOWNLOAD_WORKERS):
+    """Create an authenticated session with a connection pool.
+
+    Connection errors and temporary server errors are retried with
+    exponential backoff.
+
+    Parameters:
+        username (str): The username for authentication.
+        password (str): The password for authentication.
+        pool_size (int, optional): Number of pooled connections per host.
+                                   Defaults to constants.DOWNLOAD_WORKERS.
+
+    Returns:
+        requests.Session: Session reusing connections between downloads.
+    """
+    session = requests.Session()
+    session.auth = (username, password)
+    retry = Retry(
+        total=constants.DOWNLOAD_MAX_ATTEMPTS - 1,
+        backoff_factor=constants.DOWNLOAD_BACKOFF,
+        status_forcelist=[429, 500, 502, 503, 504],
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def file_path_for(url, folder_path):
+    """Build the path a downloaded export is saved to.
+
+    Parameters:
+        url (str): The URL of the export.
+        folder_path (str): The folder the file is saved in.
+
+    Returns:
+        str: Path of the CSV file.
+    """
+    return os.path.join(folder_path, "{0}.csv".format(url.rstrip("/").split("/")[-1]))
+
+
+def load_state(state_file=constants.DOWNLOAD_STATE_FILE):
+    """Load the validators of previous downloads.
+
+    Parameters:
+        state_file (str, optional): Path of the state file.
+                                    Defaults to constants.DOWNLOAD_STATE_FILE.
+
+    Returns:
+        dict: ETag and Last-Modified headers keyed by URL.
+    """
+    try:
+        with open(state_file, encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state, state_file=constants.DOWNLOAD_STATE_FILE):
+    """Atomically write the validators of previous downloads.
+
+    Parameters:
+        state (dict): ETag and Last-Modified headers keyed by URL.
+        state_file (str, optional): Path of the state file.
+                                    Defaults to constants.DOWNLOAD_STATE_FILE.
+    """
+    os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+    tmp_file = "{0}.tmp".format(state_file)
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2, sort_keys=True)
+    os.replace(tmp_file, state_file)
+
+
+def download_file(session, url, folder_path, validators=None):
+    """Download a file unless the server reports it as unchanged.
+
+    The body is streamed to a temporary file in chunks and renamed once
+    complete, so an interrupted download never replaces a valid file.
+
+    Parameters:
+        session (requests.Session): Session used for the request.
+        url (str): The URL of the file to download.
+        folder_path (str): The path of the folder where the file will be saved.
+        validators (dict, optional): ETag and Last-Modified of the saved file.
+
+    Returns:
+        tuple: Download status and the validators of the saved file.
+    """
+    file_path = file_path_for(url, folder_path)
+    headers = {}
+    if validators and os.path.isfile(file_path):
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    with session.get(
+        url, headers=headers, stream=True, timeout=constants.DOWNLOAD_TIMEOUT
+    ) as response:
+        if response.status_code == 304:
+            return NOT_MODIFIED, validators
+        if response.status_code == 401:
+            return UNAUTHORIZED, validators
+        response.raise_for_status()
+        tmp_path = "{0}.part".format(file_path)
+        try:
+            with open(tmp_path, "wb") as file:
+                for chunk in response.iter_content(chunk_size=constants.DOWNLOAD_CHUNK_SIZE):
+                    file.write(chunk)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return DOWNLOADED, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+
+def download_all(
+    urls,
+    folder_path,
+    session,
+    workers=constants.DOWNLOAD_WORKERS,
+    state_file=constants.DOWNLOAD_STATE_FILE,
+):
+    """Download several files in parallel.
+
+    A failing download is logged and does not stop the others.
+
+    Parameters:
+        urls (list): URLs of the files to download.
+        folder_path (str): The path of the folder where the files will be saved.
+        session (requests.Session): Session used for the requests.
+        workers (int, optional): Number of parallel downloads.
+                                 Defaults to constants.DOWNLOAD_WORKERS.
+        state_file (str, optional): Path of the state file.
+                                    Defaults to constants.DOWNLOAD_STATE_FILE.
+
+    Returns:
+        dict: Download status keyed by URL.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    state = load_state(state_file)
+
+    def download(url):
+        try:
+            return download_file(session, url, folder_path, state.get(url))
+        except requests.RequestException as error:
+            logging.error("Download of {0} failed: {1}".format(url, error))
+            return FAILED, state.get(url)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(urls, pool.map(download, urls)))
+
+    statuses = {}
+    for url, (status, validators) in results.items():
+        statuses[url] = status
+        if status == DOWNLOADED:
+            state[url] = validators
+        logging.info("{0}: {1}".format(url, status))
+    save_state(state, state_file)
+    return statuses
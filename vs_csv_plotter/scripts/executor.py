@@ -0,0 +1,184 @@
+"""Functions for rendering charts sequentially or across a process pool."""
+# Import built-in modules
+import logging
+import multiprocessing
+import signal
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+# Import local modules
+import constants
+from scripts import charts, export, profiling, render_cache
+
+
+logging.basicConfig(level=logging.INFO)
+
+# Constants that may be changed at runtime, e.g. from the command line, and
+# are passed on to the worker processes.
+WORKER_CONSTANTS = [
+    "PLOT_FOLDER",
+    "PLOT_FILETYPE_LIST",
+    "SAVE_PLOT",
+    "SHOW_PLOT",
+    "EXPORT_POLICIES",
+]
+
+
+def _init_worker(overrides=None):
+    """Prepare a worker process for rendering without a display.
+
+    Parameters:
+        overrides (dict, optional): Values of `WORKER_CONSTANTS` in the parent.
+    """
+    # Import third-party modules
+    import matplotlib
+
+    # Ctrl+C reaches the whole process group, the parent shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for name, value in (overrides or {}).items():
+        setattr(constants, name, value)
+    if not constants.SHOW_PLOT:
+        matplotlib.use("Agg")
+
+
+def _run_job(spec, wait=True):
+    """Render a single chart and capture any error it raises.
+
+    Parameters:
+        spec (charts.ChartSpec): Chart to render.
+        wait (bool, optional): Wait until the chart's files are written.
+
+    Returns:
+        str: Formatted traceback if the job failed, None otherwise.
+    """
+    try:
+        with profiling.stage(spec.name, "render"):
+            charts.render(spec)
+    except Exception:  # noqa: B902 A failing chart must not stop the others
+        return traceback.format_exc()
+    if wait:
+        return export.flush().get(spec.title)
+    return None
+
+
+def _run_pooled_job(spec, profile=None):
+    """Render a single chart in a worker process.
+
+    Parameters:
+        spec (charts.ChartSpec): Chart to render.
+        profile (dict, optional): Settings to enable the profiler with.
+
+    Returns:
+        tuple: Formatted traceback if the job failed or None, and the stages
+               the profiler recorded in the worker.
+    """
+    if profile and not profiling.is_enabled():
+        profiling.enable(**profile)
+    return _run_job(spec), profiling.drain()
+
+
+def _collect(future):
+    """Return the result of a pooled job future, including worker crashes.
+
+    Parameters:
+        future (concurrent.futures.Future): Future of a submitted job.
+
+    Returns:
+        tuple: Formatted traceback if the job failed or None, and the stages
+               the profiler recorded in the worker.
+    """
+    try:
+        return future.result()
+    except Exception:  # noqa: B902 e.g. BrokenProcessPool
+        return traceback.format_exc(), []
+
+
+def create_pool(workers=constants.PLOT_WORKERS):
+    """Start worker processes for rendering charts.
+
+    pyplot keeps global state, so jobs need separate processes. Spawned
+    workers avoid inheriting the parent's figures and backend. The workers
+    receive the current values of `WORKER_CONSTANTS`.
+
+    Parameters:
+        workers (int, optional): Number of worker processes, None uses all cores.
+                                 Defaults to constants.PLOT_WORKERS.
+
+    Returns:
+        ProcessPoolExecutor: Pool to pass to `run_jobs`, shut it down when done.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=({name: getattr(constants, name) for name in WORKER_CONSTANTS},),
+    )
+
+
+def run_jobs(
+    specs,
+    workers=constants.PLOT_WORKERS,
+    use_cache=constants.RENDER_CACHE,
+    pool=None,
+):
+    """Render charts and report the ones that failed.
+
+    Every chart renders in isolation, a failing chart is logged and does not
+    stop the remaining ones. Output files are named after the chart title,
+    so the result does not depend on the order in which jobs finish.
+    Charts whose saved output is current according to the render cache are
+    skipped, the cache is only updated from this process.
+
+    Parameters:
+        specs (list): ChartSpecs to render.
+        workers (int, optional): Number of worker processes, None uses all
+                                 cores and 1 runs in the current process.
+                                 Defaults to constants.PLOT_WORKERS.
+        use_cache (bool, optional): Skip charts with current output.
+                                    Defaults to constants.RENDER_CACHE.
+        pool (ProcessPoolExecutor, optional): Pool of `create_pool` to reuse,
+                                              `workers` is ignored if given.
+
+    Returns:
+        dict: Tracebacks of failed charts keyed by chart name.
+    """
+    use_cache = use_cache and constants.SAVE_PLOT and not constants.SHOW_PLOT
+    if use_cache:
+        manifest = render_cache.load()
+        specs, keys = render_cache.split_stale(specs, manifest)
+    if not specs:
+        return {}
+    if pool is None and workers == 1:
+        # Files are written in the background while the next chart is drawn.
+        results = [_run_job(spec, wait=False) for spec in specs]
+        write_errors = export.flush()
+        results = [
+            error or write_errors.get(spec.title)
+            for spec, error in zip(specs, results)
+        ]
+    else:
+        job_pool = pool or create_pool(workers)
+        try:
+            futures = [
+                job_pool.submit(_run_pooled_job, spec, profiling.settings())
+                for spec in specs
+            ]
+            results = []
+            for future in futures:
+                error, events = _collect(future)
+                profiling.record(*events)
+                results.append(error)
+        finally:
+            if pool is None:
+                job_pool.shutdown()
+
+    failed = {}
+    for spec, error in zip(specs, results):
+        if error:
+            logging.error("Chart {0} failed:\n{1}".format(spec.name, error))
+            failed[spec.name] = error
+        elif use_cache:
+            manifest[spec.name] = keys[spec.name]
+    if use_cache:
+        render_cache.save(manifest)
+    return failed
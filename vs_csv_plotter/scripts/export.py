@@ -0,0 +1,252 @@
+"""Functions for exporting a drawn figure to several file types at once."""
+# Import built-in modules
+import contextlib
+import io
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Import local modules
+import constants
+from scripts import file_utils, profiling
+
+# Import third-party modules
+import numpy as np
+
+
+logging.basicConfig(level=logging.INFO)
+
+# File types encoded from the Agg pixel buffer, all others are vector formats.
+RASTER_FILETYPES = {"png", "jpg", "jpeg", "tif", "tiff", "webp"}
+
+_writer = ThreadPoolExecutor(
+    max_workers=constants.EXPORT_THREADS, thread_name_prefix="export"
+)
+# Pending writes as (title, future).
+_pending = []
+# File types and the dict collecting their bytes while inside `capture`.
+_capture = None
+
+
+def _write_raster(fig_file, rgba, extension, dpi):
+    """Encode a pixel buffer and write it to a file.
+
+    Parameters:
+        fig_file (str): Path of the file.
+        rgba (np.ndarray): Pixels of the drawn figure.
+        extension (str): File type to encode.
+        dpi (float): Resolution stored in the file.
+    """
+    # Import third-party modules
+    from matplotlib import image  # noqa: WPS433 Only needed once a chart is drawn
+
+    with profiling.stage(fig_file, "write"):
+        image.imsave(
+            fig_file, rgba, format=extension, origin="upper", dpi=dpi
+        )
+    logging.info("Saved {0}".format(fig_file))
+
+
+def _write_bytes(fig_file, content):
+    """Write already rendered content to a file.
+
+    Parameters:
+        fig_file (str): Path of the file.
+        content (bytes): Rendered file content.
+    """
+    with profiling.stage(fig_file, "write"), open(fig_file, "wb") as file:
+        file.write(content)
+    logging.info("Saved {0}".format(fig_file))
+
+
+@contextlib.contextmanager
+def capture(extensions):
+    """Keep the files of exported figures in memory instead of writing them.
+
+    Like pyplot, capturing is process wide and must not be used from
+    several threads at once.
+
+    Parameters:
+        extensions (list): File types to export instead of
+                           constants.PLOT_FILETYPE_LIST.
+
+    Yields:
+        dict: Content of the exported files keyed by file type, filled once
+              a figure is exported.
+    """
+    global _capture  # noqa: WPS420 Exports are triggered deep inside the drawing functions
+    files = {}
+    _capture = (list(extensions), files)
+    try:
+        yield files
+    finally:
+        _capture = None
+
+
+def is_capturing():
+    """Check whether exported figures are kept in memory.
+
+    Returns:
+        bool: True inside `capture`.
+    """
+    return _capture is not None
+
+
+def policy_for(kind):
+    """Look up the export policy of a chart kind.
+
+    Parameters:
+        kind (str): Chart kind, None for the default policy.
+
+    Returns:
+        dict: Entries of `constants.EXPORT_POLICIES["default"]` overridden by
+              the entries of the chart kind.
+    """
+    default = constants.EXPORT_POLICIES["default"]
+    overrides = constants.EXPORT_POLICIES.get(kind, {})
+    policy = {**default, **overrides}
+    policy["dpi"] = {**default.get("dpi", {}), **overrides.get("dpi", {})}
+    return policy
+
+
+def _draw_pixels(fig, dpi):
+    """Draw a figure with Agg and copy its pixels.
+
+    Parameters:
+        fig (matplotlib.figure.Figure): Figure to draw.
+        dpi (float): Resolution to draw with.
+
+    Returns:
+        np.ndarray: RGBA pixels of the figure.
+    """
+    # Import third-party modules
+    from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: WPS433
+
+    if isinstance(fig.canvas, FigureCanvasAgg):
+        canvas = fig.canvas
+    else:
+        # Interactive backends may not be Agg based, draw on a detached canvas.
+        original_canvas = fig.canvas
+        canvas = FigureCanvasAgg(fig)
+        fig.set_canvas(original_canvas)
+    figure_dpi = fig.dpi
+    fig.dpi = dpi
+    try:
+        FigureCanvasAgg.draw(canvas)
+        return np.array(canvas.buffer_rgba(), copy=True)
+    finally:
+        fig.dpi = figure_dpi
+
+
+def _vector_bytes(fig, extension, dpi, policy):
+    """Render a figure to a vector file in memory.
+
+    Parameters:
+        fig (matplotlib.figure.Figure): Figure to render.
+        extension (str): Vector file type.
+        dpi (float): Resolution of rasterized areas.
+        policy (dict): Export policy as returned by `policy_for`.
+
+    Returns:
+        bytes: Content of the file.
+    """
+    # Import third-party modules
+    import matplotlib  # noqa: WPS433 Only needed once a chart is drawn
+
+    buffer = io.BytesIO()
+    with matplotlib.rc_context({
+        "svg.fonttype": policy["svg_fonttype"],
+        "pdf.fonttype": policy["pdf_fonttype"],
+    }):
+        fig.savefig(
+            buffer,
+            format=extension,
+            dpi=dpi,
+            facecolor=constants.BACKGROUNDCOLOR,
+        )
+    return buffer.getvalue()
+
+
+def _raster_bytes(rgba, extension, dpi):
+    """Encode a pixel buffer in memory.
+
+    Parameters:
+        rgba (np.ndarray): Pixels of the drawn figure.
+        extension (str): File type to encode.
+        dpi (float): Resolution stored in the file.
+
+    Returns:
+        bytes: Content of the file.
+    """
+    # Import third-party modules
+    from matplotlib import image  # noqa: WPS433 Only needed once a chart is drawn
+
+    buffer = io.BytesIO()
+    image.imsave(buffer, rgba, format=extension, origin="upper", dpi=dpi)
+    return buffer.getvalue()
+
+
+def export_figure(fig, title, extensions=None, policy=None):
+    """Save a figure to several file types, drawing raster output only once.
+
+    The figure is drawn once with Agg per raster resolution and all raster
+    files are encoded from that pixel buffer. Vector files are rendered to
+    memory from the same figure state. Encoding and writing happens on
+    background threads, call `flush` to wait for them. Inside `capture`
+    the files are encoded right away and kept in memory.
+
+    Parameters:
+        fig (matplotlib.figure.Figure): Figure to export.
+        title (str): Title of the chart, used for the file names.
+        extensions (list, optional): File types to save.
+                                     Defaults to constants.PLOT_FILETYPE_LIST.
+        policy (dict, optional): Export policy as returned by `policy_for`.
+                                 Defaults to the default policy.
+    """
+    # Import third-party modules
+    from matplotlib.collections import Collection  # noqa: WPS433 Only needed once a chart is drawn
+
+    captured_files = None
+    if _capture is not None:
+        extensions, captured_files = _capture
+    extensions = extensions or constants.PLOT_FILETYPE_LIST
+    policy = policy or policy_for(None)
+    fig.patch.set_facecolor(constants.BACKGROUNDCOLOR)
+    if policy["rasterize"]:
+        for artist in fig.findobj(Collection):
+            artist.set_rasterized(True)
+
+    pixels = {}
+    for extension in extensions:
+        fig_file = file_utils.plot_file_path(title, extension)
+        dpi = policy["dpi"].get(extension, fig.dpi)
+        if extension in RASTER_FILETYPES:
+            if dpi not in pixels:
+                pixels[dpi] = _draw_pixels(fig, dpi)
+            if captured_files is not None:
+                captured_files[extension] = _raster_bytes(pixels[dpi], extension, dpi)
+                continue
+            future = _writer.submit(_write_raster, fig_file, pixels[dpi], extension, dpi)
+        else:
+            content = _vector_bytes(fig, extension, dpi, policy)
+            if captured_files is not None:
+                captured_files[extension] = content
+                continue
+            future = _writer.submit(_write_bytes, fig_file, content)
+        _pending.append((title, future))
+
+
+def flush():
+    """Wait until all pending files are written.
+
+    Returns:
+        dict: Tracebacks of failed writes keyed by chart title.
+    """
+    errors = {}
+    while _pending:
+        title, future = _pending.pop(0)
+        try:
+            future.result()
+        except Exception:  # noqa: B902 A failing write must not stop the others
+            errors[title] = traceback.format_exc()
+    return errors
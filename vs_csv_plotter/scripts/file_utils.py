@@ -1,23 +1,62 @@
 """Functions for preparing, processing, and caching data from CSV files."""
 # Import built-in modules
-import locale
+import glob
+import hashlib
+import json
 import logging
 import os
 import re
-import getpass
+import time
 from datetime import datetime
+from urllib.parse import urlparse
 
 # Import local modules
 import constants
+from scripts import credentials, downloader
 
 # Import third-party modules
 from cachetools import TTLCache, cached
 import pandas as pd
-import requests
+
+try:
+    from pyarrow import feather
+except ImportError:
+    feather = None
 
 
 # 10 minutes in seconds.
 _CACHE_TIMEOUT = 600
+# German timestamp as exported by the forms app,
+# e.g. "Montag, 6. November 2023 um 14:05:33 GMT+0:00".
+_TIMESTAMP_PATTERN = re.compile(
+    r"\w+, (?P<day>\d{1,2})\. (?P<month>\w+) (?P<year>\d{4}) "
+    + r"um (?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2}) GMT\+0:00"
+)
+_MONTHS = {
+    "Januar": 1, "Februar": 2, "März": 3, "April": 4, "Mai": 5, "Juni": 6,
+    "Juli": 7, "August": 8, "September": 9, "Oktober": 10, "November": 11, "Dezember": 12
+}
+# Columns used by the plots and the types they are stored as.
+_COLUMN_TYPES = {
+    constants.TIMESTAMP_COLUMN: "string",
+    constants.AGE_COLUMN: "category",
+    constants.RATING_COLUMN: "Int8",
+    constants.SUPPORT_COLUMN: "category",
+    constants.YOUTH_TICKET_COLUMN: "category",
+    constants.D_TICKET_COLUMN: "category",
+}
+_TRANSLATIONS = {
+    "Ja": "Yes",
+    "Nein": "No",
+    "Unentschlossen": "Don't know",
+}
+# Changes whenever the cached frames would be parsed or aggregated differently.
+DATA_CACHE_SCHEMA = hashlib.sha256(
+    repr((
+        constants.VERSION, _COLUMN_TYPES, _TRANSLATIONS, constants.TIMELINE_RESOLUTION,
+    )).encode()
+).hexdigest()
+_DATA_CACHE_MANIFEST = "manifest.json"
 logging.basicConfig(level=logging.INFO)
 
 
@@ -33,11 +72,16 @@ def prepare_plot_folder():
         logging.info("created {0}".format(os.path.join(constants.PLOT_FOLDER, extension)))
 
 
-def concat_from_folder(folder_path=constants.DATA_FOLDER):
+def concat_from_folder(folder_path=constants.DATA_FOLDER, use_cache=constants.DATA_CACHE):
     """Concatenate DataFrames from CSV files in a specified folder.
 
+    Parsed and translated files are cached as Feather files in
+    `constants.DATA_CACHE_FOLDER`, so only new or modified CSV files are parsed.
+
     Parameters:
         folder_path (str, optional): Path to the folder containing CSV files.
+        use_cache (bool, optional): Use the cache of parsed files if pyarrow is
+                                    installed. Defaults to constants.DATA_CACHE.
 
     Raises:
         FileNotFoundError: If no CSV file is found in folder.
@@ -45,34 +89,250 @@ def concat_from_folder(folder_path=constants.DATA_FOLDER):
     Returns:
         pd.DataFrame: Combined DataFrame containing data from all CSV files.
     """
+    csv_files = list_csv_files(folder_path)
+    if use_cache and feather is None:
+        logging.warning("pyarrow is not installed, CSV files are parsed without cache.")
+        use_cache = False
+    manifest = _load_data_cache_manifest() if use_cache else {}
+    df_list = []
+    for file_path in csv_files:
+        if use_cache:
+            df_list.append(_read_cached_survey_csv(file_path, manifest))
+        else:
+            df_list.append(read_survey_csv(file_path))
+    if use_cache:
+        _save_data_cache_manifest(manifest)
+    return concat_survey_data(df_list)
+
+
+def list_csv_files(folder_path=constants.DATA_FOLDER):
+    """List the CSV files in a folder.
+
+    Parameters:
+        folder_path (str, optional): Path to the folder containing CSV files.
+
+    Raises:
+        FileNotFoundError: If no CSV file is found in folder.
+
+    Returns:
+        list: Sorted paths of the CSV files.
+    """
     csv_files = [file for file in os.listdir(folder_path) if file.endswith(".csv")]
     if not csv_files:
         raise FileNotFoundError("No CSV Files in Folder {0}.".format(
             os.path.abspath(folder_path)
             )
         )
-    df_list = []
-    for file in csv_files:
-        file_path = os.path.join(folder_path, file)
-        df = pd.read_csv(file_path)
-        df_list.append(df)
+    return [os.path.join(folder_path, file) for file in sorted(csv_files)]
+
+
+def _file_signature(file_path, with_hash=False):
+    """Describe the state of a file.
+
+    Parameters:
+        file_path (str): Path of the file.
+        with_hash (bool, optional): Include the SHA-256 of the content.
+
+    Returns:
+        dict: Size, modification time and optionally the hash of the file.
+    """
+    stat = os.stat(file_path)
+    signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        signature["sha256"] = digest.hexdigest()
+    return signature
+
+
+def _read_cached_survey_csv(file_path, manifest):
+    """Read a translated survey CSV from the cache, parsing it if needed.
+
+    A cache entry is reused if size and modification time match. Otherwise
+    the content hash decides, so re-downloaded but identical files are not
+    parsed again.
+
+    Parameters:
+        file_path (str): Path of the CSV file.
+        manifest (dict): Cache manifest, updated in place.
+
+    Returns:
+        pd.DataFrame: Typed and translated DataFrame.
+    """
+    key = os.path.abspath(file_path)
+    cache_file = _data_cache_file(key)
+    entry = manifest.get(key)
+    signature = _file_signature(file_path)
+    if entry and os.path.isfile(cache_file):
+        if entry["size"] == signature["size"] and entry["mtime_ns"] == signature["mtime_ns"]:
+            return feather.read_feather(cache_file, memory_map=True)
+        signature = _file_signature(file_path, with_hash=True)
+        if entry.get("sha256") == signature["sha256"]:
+            manifest[key] = signature
+            return feather.read_feather(cache_file, memory_map=True)
+    if "sha256" not in signature:
+        signature = _file_signature(file_path, with_hash=True)
+    df = replace_ger_eng(read_survey_csv(file_path))
+    os.makedirs(constants.DATA_CACHE_FOLDER, exist_ok=True)
+    # Uncompressed files can be memory-mapped without copying.
+    feather.write_feather(df, cache_file, compression="uncompressed")
+    manifest[key] = signature
+    logging.info("Cached {0}".format(file_path))
+    return df
+
+
+def _data_cache_file(key):
+    """Build the path of the cached frame of a CSV file.
+
+    Parameters:
+        key (str): Absolute path of the CSV file.
+
+    Returns:
+        str: Path of the Feather file.
+    """
+    return os.path.join(
+        constants.DATA_CACHE_FOLDER,
+        "{0}.feather".format(hashlib.sha256(key.encode()).hexdigest()[:16])
+    )
+
+
+def _load_data_cache_manifest():
+    """Load the manifest of the data cache.
+
+    Returns:
+        dict: File signatures keyed by absolute CSV path, empty if the cache
+              was written by a different schema.
+    """
+    manifest_file = os.path.join(constants.DATA_CACHE_FOLDER, _DATA_CACHE_MANIFEST)
+    try:
+        with open(manifest_file, encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("schema") != DATA_CACHE_SCHEMA:
+        return {}
+    return manifest.get("files", {})
+
+
+def _save_data_cache_manifest(manifest):
+    """Atomically write the manifest of the data cache.
+
+    Entries of removed CSV files and Feather files without an entry are
+    deleted.
+
+    Parameters:
+        manifest (dict): File signatures keyed by absolute CSV path, updated
+                         in place.
+    """
+    for key in [key for key in manifest if not os.path.isfile(key)]:
+        del manifest[key]
+    cache_files = {_data_cache_file(key) for key in manifest}
+    for cache_file in glob.glob(os.path.join(constants.DATA_CACHE_FOLDER, "*.feather")):
+        if cache_file not in cache_files:
+            os.remove(cache_file)
+            logging.info("Removed stale cache file {0}".format(cache_file))
+    os.makedirs(constants.DATA_CACHE_FOLDER, exist_ok=True)
+    manifest_file = os.path.join(constants.DATA_CACHE_FOLDER, _DATA_CACHE_MANIFEST)
+    tmp_file = "{0}.tmp".format(manifest_file)
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump({"schema": DATA_CACHE_SCHEMA, "files": manifest}, file, indent=2)
+    os.replace(tmp_file, manifest_file)
+
+
+def read_survey_csv(file_path):
+    """Read the columns used by the plots from a CSV file with compact types.
+
+    Answers are stored as categoricals and the financial rating as a small
+    nullable integer. Columns missing in the file are added as empty columns.
+
+    Parameters:
+        file_path (str | file-like): Path or buffer of the CSV file.
+
+    Returns:
+        pd.DataFrame: Typed DataFrame with one column per entry in `_COLUMN_TYPES`.
+    """
+    df = pd.read_csv(
+        file_path,
+        usecols=lambda column: column in _COLUMN_TYPES,
+        dtype=_COLUMN_TYPES,
+    )
+    return df.reindex(columns=list(_COLUMN_TYPES)).astype(_COLUMN_TYPES)
+
+
+def iter_survey_csv(file_path, chunksize=constants.INGESTION_CHUNK_SIZE):
+    """Read a CSV file in chunks like `read_survey_csv`.
+
+    Parameters:
+        file_path (str): Path of the CSV file.
+        chunksize (int, optional): Number of rows per chunk.
+                                   Defaults to constants.INGESTION_CHUNK_SIZE.
+
+    Yields:
+        pd.DataFrame: Typed and translated DataFrame of each chunk.
+    """
+    with pd.read_csv(
+        file_path,
+        usecols=lambda column: column in _COLUMN_TYPES,
+        dtype=_COLUMN_TYPES,
+        chunksize=chunksize,
+    ) as reader:
+        for chunk in reader:
+            yield replace_ger_eng(
+                chunk.reindex(columns=list(_COLUMN_TYPES)).astype(_COLUMN_TYPES)
+            )
+
+
+def concat_survey_data(df_list):
+    """Concatenate typed DataFrames without losing categorical columns.
+
+    Parameters:
+        df_list (list): DataFrames returned by `read_survey_csv`.
+
+    Returns:
+        pd.DataFrame: Combined DataFrame.
+    """
+    if len(df_list) == 1:
+        return df_list[0]
+    df_list = [df.copy() for df in df_list]
+    for column in df_list[0].select_dtypes("category"):
+        # Categoricals only stay categorical if all frames share the categories.
+        categories = pd.api.types.union_categoricals(
+            [df[column] for df in df_list]
+        ).categories
+        for df in df_list:
+            df[column] = df[column].cat.set_categories(categories)
     return pd.concat(df_list, ignore_index=True)
 
 
 def replace_ger_eng(csv_data):
     """Replace German with English labels.
 
+    Categorical columns are translated by renaming their categories,
+    other text columns except the timestamp are translated cell by cell.
+
     Parameters:
         csv_data (pd.DataFrame): DataFrame containing survey data.
 
     Returns:
         pd.DataFrame: DataFrame with replaced labels.
     """
-    csv_data.replace({
-        "Ja": "Yes",
-        "Nein": "No",
-        "Unentschlossen": "Don't know",
-    }, inplace=True)
+    for column in csv_data.select_dtypes("category"):
+        categories = csv_data[column].cat.categories
+        translated = categories.map(lambda label: _TRANSLATIONS.get(label, label))
+        if translated.is_unique:
+            csv_data[column] = csv_data[column].cat.rename_categories(translated)
+        else:
+            csv_data[column] = csv_data[column].astype(object).replace(
+                _TRANSLATIONS
+            ).astype("category")
+    text_columns = [
+        column for column in csv_data.select_dtypes(include=["object", "string"])
+        if column != constants.TIMESTAMP_COLUMN
+    ]
+    if text_columns:
+        csv_data[text_columns] = csv_data[text_columns].replace(_TRANSLATIONS)
     return csv_data
 
 
@@ -103,6 +363,18 @@ def get_timestamp(folder_path=constants.DATA_FOLDER):
     )
 
 
+def format_data_timestamp(timestamp):
+    """Format the newest submission of the survey data for the footnote.
+
+    Parameters:
+        timestamp (pd.Timestamp): Newest submission.
+
+    Returns:
+        str: Timestamp formatted as "Data as of ...".
+    """
+    return "Data as of {0} UTC".format(timestamp.strftime("%d.%m.%Y - %H:%M"))
+
+
 def sanitize_filename(name):
     """Sanitize a string to be suitable as a filename.
 
@@ -119,41 +391,63 @@ def sanitize_filename(name):
     return re.sub("[^a-zA-Z0-9_-]", "", tmp_name.lower())
 
 
-def download_file(url, folder_path, username, password):
-    """Downloads a file from a given URL and saves it to a specified folder.
+def plot_file_path(title, extension):
+    """Build the path a plot is saved to.
 
     Parameters:
-        url (str): The URL of the file to download.
-        folder_path (str): The path of the folder where the file will be saved.
-        username (str): The username for authentication.
-        password (str): The password for authentication.
-
-    """
-    authenticated = False
-    while not authenticated:
-        response = requests.get(url, auth=(username, password), timeout=20)
-        if response.status_code == 401:  # Unauthorized
-            logging.warning("Authentication failed. Please try again.")
-            username = input("Enter your username: ")
-            password = getpass.getpass("Enter your password: ")
-        else:
-            authenticated = True
+        title (str): Title of the plot.
+        extension (str): File type of the plot.
 
-    file_name = "{0}.csv".format(url.split("/")[-1])
-    with open(f"{folder_path}/{file_name}", "wb") as file:
-        file.write(response.content)
+    Returns:
+        str: Path inside the plot folder.
+    """
+    return "{0}/{1}/{2}.{1}".format(
+        constants.PLOT_FOLDER,
+        extension,
+        sanitize_filename(title)
+    )
 
 
 def download_csv_data():
-    """Prompts the user for their username and password, then downloads CSV files from list.
+    """Downloads CSV files from list with credentials from the configured sources.
 
     URLs are defined in `constants.CSV_DOWNLOAD_LIST`, files are saved in `constants.DATA_FOLDER`.
+    Files are downloaded in parallel and skipped if the server reports them as unchanged.
+    Credentials come from `constants.CREDENTIAL_SOURCES`, rejected credentials are
+    retried at most `constants.DOWNLOAD_MAX_ATTEMPTS` times. Nothing is downloaded
+    in offline mode.
+
+    Raises:
+        credentials.AuthenticationError: If no source provides accepted credentials.
 
     """
-    username = input("Enter your username: ")
-    password = getpass.getpass("Enter your password: ")
-    for url in constants.CSV_DOWNLOAD_LIST:
-        download_file(url, constants.DATA_FOLDER, username, password)
+    urls = list(constants.CSV_DOWNLOAD_LIST)
+    if credentials.is_offline() or not urls:
+        logging.info("Offline, using CSV files in {0}".format(constants.DATA_FOLDER))
+        return
+    host = urlparse(urls[0]).hostname
+    attempt = 0
+    for username, password in credentials.iter_credentials(host):
+        with downloader.create_session(username, password) as session:
+            statuses = downloader.download_all(urls, constants.DATA_FOLDER, session)
+        urls = [url for url, status in statuses.items() if status == downloader.UNAUTHORIZED]
+        if not urls:
+            return
+        attempt += 1
+        if attempt >= constants.DOWNLOAD_MAX_ATTEMPTS:
+            break
+        logging.warning("Authentication failed for {0} files.".format(len(urls)))
+        time.sleep(constants.DOWNLOAD_BACKOFF * 2 ** (attempt - 1))
+    raise credentials.AuthenticationError(
+        "No accepted credentials for {0} after {1} attempts, set {2} and {3} or "
+        "{4}=1 to use cached CSV files.".format(
+            host,
+            attempt,
+            constants.CREDENTIAL_ENV_USERNAME,
+            constants.CREDENTIAL_ENV_PASSWORD,
+            constants.CREDENTIAL_ENV_OFFLINE,
+        )
+    )
 
 
 def convert_timestamp(timestamp):
@@ -163,26 +457,38 @@ def convert_timestamp(timestamp):
         timestamp (str): CSV Timestamp
         
     Returns:
-        timestamp (str): Timestamp which can be used for plotting
+        timestamp (datetime): Timestamp which can be used for plotting
     """
-    locale.setlocale(locale.LC_TIME, "de_DE.UTF-8")
-    pattern = re.compile(r"\w+, (?P<day>\d{1,2})\. (?P<month>\w+) (?P<year>\d{4}) um (?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2}) GMT\+0:00")
-    match = re.match(pattern, timestamp)
-    if not match:
+    match = _TIMESTAMP_PATTERN.match(timestamp)
+    if not match or match.group("month") not in _MONTHS:
         logging.warning(f"Timestamp {timestamp} does not match the expected format.")
-        locale.setlocale(locale.LC_TIME, "C")
         return None
-    month_map = {
-        "Januar": 1, "Februar": 2, "März": 3, "April": 4, "Mai": 5, "Juni": 6,
-        "Juli": 7, "August": 8, "September": 9, "Oktober": 10, "November": 11, "Dezember": 12
-    }
-    dt = datetime(
+    return datetime(
         int(match.group("year")),
-        month_map[match.group("month")],
+        _MONTHS[match.group("month")],
         int(match.group("day")),
         int(match.group("hour")),
         int(match.group("minute")),
         int(match.group("second"))
     )
-    locale.setlocale(locale.LC_TIME, "C")
-    return dt
+
+
+def convert_timestamps(timestamps):
+    """Convert a column of CSV timestamps at once.
+
+    Args:
+        timestamps (pd.Series): CSV Timestamps
+
+    Returns:
+        pd.Series: Datetimes, NaT where a timestamp does not match the expected format.
+    """
+    parts = timestamps.astype("string").str.extract(
+        "^{0}".format(_TIMESTAMP_PATTERN.pattern)
+    )
+    parts["month"] = parts["month"].map(_MONTHS)
+    parts = parts.astype("float64")
+    converted = pd.to_datetime(parts, errors="coerce")
+    mismatches = int(converted.isna().sum() - timestamps.isna().sum())
+    if mismatches:
+        logging.warning(f"{mismatches} timestamps do not match the expected format.")
+    return converted
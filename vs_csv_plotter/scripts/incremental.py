@@ -0,0 +1,195 @@
+"""Incremental aggregation of append-only CSV exports."""
+# Import built-in modules
+import functools
+import hashlib
+import io
+import logging
+import os
+import pickle
+
+# Import local modules
+import constants
+from scripts import file_utils
+from scripts.aggregation import SurveyCube
+
+# Import third-party modules
+import numpy as np
+
+
+logging.basicConfig(level=logging.INFO)
+
+# Bytes at the start of a file that must not change between runs.
+_HEAD_SIZE = 64 * 1024
+
+
+def _head_hash(file_path, size):
+    """Hash the beginning of a file.
+
+    Parameters:
+        file_path (str): Path of the file.
+        size (int): Number of bytes to hash at most.
+
+    Returns:
+        str: SHA-256 of the first bytes.
+    """
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read(min(size, _HEAD_SIZE))).hexdigest()
+
+
+def load_state(state_file=constants.INCREMENTAL_STATE_FILE):
+    """Load the aggregation state of the previous run.
+
+    Parameters:
+        state_file (str, optional): Path of the state file.
+                                    Defaults to constants.INCREMENTAL_STATE_FILE.
+
+    Returns:
+        dict: State per source file keyed by absolute path, empty if the state
+              was written by a different schema.
+    """
+    try:
+        with open(state_file, "rb") as file:
+            state = pickle.load(file)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return {}
+    if state.get("schema") != file_utils.DATA_CACHE_SCHEMA:
+        return {}
+    return state["files"]
+
+
+def save_state(files, state_file=constants.INCREMENTAL_STATE_FILE):
+    """Atomically write the aggregation state.
+
+    Parameters:
+        files (dict): State per source file keyed by absolute path.
+        state_file (str, optional): Path of the state file.
+                                    Defaults to constants.INCREMENTAL_STATE_FILE.
+    """
+    os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+    tmp_file = "{0}.tmp".format(state_file)
+    with open(tmp_file, "wb") as file:
+        pickle.dump({"schema": file_utils.DATA_CACHE_SCHEMA, "files": files}, file)
+    os.replace(tmp_file, state_file)
+
+
+def _complete_records(data):
+    """Cut the bytes after the last complete CSV record.
+
+    Line breaks inside quoted fields do not end a record, they follow an odd
+    number of quotes. Escaped quotes are doubled and keep the count even.
+
+    Parameters:
+        data (bytes): Bytes starting at the beginning of a record.
+
+    Returns:
+        bytes: Complete records only, empty if there are none.
+    """
+    characters = np.frombuffer(data, dtype=np.uint8)
+    line_breaks = np.flatnonzero(characters == ord("\n"))
+    quotes = np.cumsum(characters == ord('"'))
+    record_ends = line_breaks[quotes[line_breaks] % 2 == 0]
+    return data[:record_ends[-1] + 1] if len(record_ends) else b""
+
+
+def _aggregate(header, records):
+    """Aggregate CSV records below the header of their file.
+
+    Parameters:
+        header (bytes): First line of the file.
+        records (bytes): Complete records.
+
+    Returns:
+        tuple: SurveyCube and number of rows.
+    """
+    chunk = file_utils.replace_ger_eng(
+        file_utils.read_survey_csv(io.BytesIO(header + records))
+    )
+    return SurveyCube.from_frame(chunk), len(chunk)
+
+
+def _update_file(file_path, file_state):
+    """Aggregate the rows appended to a file since the last run.
+
+    Only the bytes after the previously processed offset are parsed. If the
+    file shrank or its beginning changed, it is aggregated from scratch.
+    A last record without line break, as finished exports often end, is
+    counted in "pending" but read again on the next run, in case the export
+    is still being written. A last record ending inside a quoted field is
+    left for the next run.
+
+    Parameters:
+        file_path (str): Path of the CSV file.
+        file_state (dict): State of the file from the last run, or None.
+
+    Returns:
+        dict: New state with "offset", "head", "rows", "cube" and "pending".
+    """
+    size = os.path.getsize(file_path)
+    if file_state and (
+        size < file_state["offset"]
+        or _head_hash(file_path, file_state["offset"]) != file_state["head"]
+    ):
+        logging.info("{0} was rewritten, aggregating it again".format(file_path))
+        file_state = None
+
+    with open(file_path, "rb") as file:
+        header = file.readline()
+        offset = max(file_state["offset"] if file_state else 0, len(header))
+        file.seek(offset)
+        data = file.read()
+    tail = _complete_records(data)
+    last_record = data[len(tail):]
+    pending = None
+    if last_record.strip() and last_record.count(b'"') % 2 == 0:
+        pending, _ = _aggregate(header, last_record + b"\n")
+
+    cube = file_state["cube"] if file_state else None
+    rows = file_state["rows"] if file_state else 0
+    if tail:
+        chunk_cube, chunk_rows = _aggregate(header, tail)
+        cube = cube.merge(chunk_cube) if cube else chunk_cube
+        offset += len(tail)
+        rows += chunk_rows
+        logging.info("Aggregated {0} new rows of {1}".format(chunk_rows, file_path))
+    return {
+        "offset": offset,
+        "head": _head_hash(file_path, offset),
+        "rows": rows,
+        "cube": cube,
+        "pending": pending,
+    }
+
+
+def update_cube(folder_path=constants.DATA_FOLDER, state_file=constants.INCREMENTAL_STATE_FILE):
+    """Update the persisted aggregates with new rows and return the combined cube.
+
+    The aggregates are kept per source file, so a rewritten export only
+    invalidates its own counts and removed exports are dropped.
+
+    Parameters:
+        folder_path (str, optional): Path to the folder containing CSV files.
+                                     Defaults to constants.DATA_FOLDER.
+        state_file (str, optional): Path of the state file.
+                                    Defaults to constants.INCREMENTAL_STATE_FILE.
+
+    Raises:
+        ValueError: If the CSV files contain no rows.
+
+    Returns:
+        SurveyCube: Counts of all rows in all CSV files.
+    """
+    previous_files = load_state(state_file)
+    files = {}
+    for file_path in file_utils.list_csv_files(folder_path):
+        key = os.path.abspath(file_path)
+        files[key] = _update_file(file_path, previous_files.get(key))
+    save_state(files, state_file)
+    cubes = [
+        cube
+        for file_state in files.values()
+        for cube in (file_state["cube"], file_state.get("pending"))
+        if cube
+    ]
+    if not cubes:
+        raise ValueError("No survey responses in {0}.".format(os.path.abspath(folder_path)))
+    return functools.reduce(SurveyCube.merge, cubes)
@@ -0,0 +1,201 @@
+"""Confidence intervals of answer shares, computed for many subgroups at once."""
+# Import built-in modules
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+# Import local modules
+import constants
+
+# Import third-party modules
+import numpy as np
+import pandas as pd
+
+
+def count_matrix(counts_by_group, categories=None):
+    """Align the answer counts of several subgroups in one matrix.
+
+    Parameters:
+        counts_by_group (dict): Number of responses per answer (pd.Series)
+                                keyed by subgroup.
+        categories (list, optional): Answers in column order. Defaults to
+                                     the sorted union of all answers.
+
+    Returns:
+        pd.DataFrame: One row per subgroup and one column per answer, answers
+                      a subgroup never gave count 0.
+    """
+    matrix = pd.DataFrame(
+        {group: counts for group, counts in counts_by_group.items()}
+    ).T.fillna(0)
+    if categories is None:
+        categories = sorted(matrix.columns)
+    return matrix.reindex(columns=list(categories), fill_value=0).astype("int64")
+
+
+def _shares(counts, cumulative):
+    """Divide counts by the number of responses of their subgroup.
+
+    Parameters:
+        counts (np.ndarray): Counts with the answers on the last axis.
+        cumulative (bool): Accumulate the answers in column order first.
+
+    Returns:
+        np.ndarray: Shares, NaN for subgroups without responses.
+    """
+    totals = counts.sum(axis=-1, keepdims=True)
+    if cumulative:
+        counts = np.cumsum(counts, axis=-1)
+    return np.divide(
+        counts, totals, out=np.full(counts.shape, np.nan), where=totals > 0
+    )
+
+
+def wilson(counts, confidence=0.95, cumulative=False):
+    """Compute Wilson score intervals of the answer shares.
+
+    Parameters:
+        counts (np.ndarray): Subgroups x answers matrix of counts.
+        confidence (float, optional): Confidence level. Defaults to 0.95.
+        cumulative (bool, optional): Intervals of the share of the first
+                                     answers up to each column instead.
+
+    Returns:
+        tuple: Lower and upper bounds, shaped like `counts`.
+    """
+    counts = np.asarray(counts, dtype="float64")
+    totals = counts.sum(axis=-1, keepdims=True)
+    shares = _shares(counts, cumulative)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denominator = 1 + z ** 2 / totals
+        center = (shares + z ** 2 / (2 * totals)) / denominator
+        margin = z * np.sqrt(
+            shares * (1 - shares) / totals + z ** 2 / (4 * totals ** 2)
+        ) / denominator
+    return np.clip(center - margin, 0, 1), np.clip(center + margin, 0, 1)
+
+
+def _resample(counts, resamples, seed, cumulative):
+    """Draw bootstrap samples of the answer shares of all subgroups at once.
+
+    Parameters:
+        counts (np.ndarray): Subgroups x answers matrix of counts.
+        resamples (int): Number of bootstrap samples.
+        seed (np.random.SeedSequence | int): Seed of the random generator.
+        cumulative (bool): Accumulate the answers in column order.
+
+    Returns:
+        np.ndarray: Resamples x subgroups x answers matrix of shares.
+    """
+    rng = np.random.default_rng(seed)
+    totals = counts.sum(axis=-1)
+    probabilities = np.divide(
+        counts,
+        totals[:, np.newaxis],
+        out=np.full(counts.shape, 1 / counts.shape[-1]),
+        where=totals[:, np.newaxis] > 0,
+    )
+    samples = rng.multinomial(
+        totals, probabilities, size=(resamples, counts.shape[0])
+    )
+    return _shares(samples, cumulative)
+
+
+def bootstrap(
+    counts,
+    confidence=0.95,
+    cumulative=False,
+    resamples=None,
+    seed=None,
+    workers=None,
+):
+    """Compute percentile bootstrap intervals of the answer shares.
+
+    The responses of every subgroup are resampled from its observed shares
+    in one multinomial draw for all subgroups. With several workers the
+    resamples are split into chunks with independent seeds and drawn in
+    worker processes.
+
+    Parameters:
+        counts (np.ndarray): Subgroups x answers matrix of counts.
+        confidence (float, optional): Confidence level. Defaults to 0.95.
+        cumulative (bool, optional): Intervals of the share of the first
+                                     answers up to each column instead.
+        resamples (int, optional): Number of bootstrap samples.
+                                   Defaults to constants.BOOTSTRAP_RESAMPLES.
+        seed (int, optional): Seed for reproducible intervals.
+                              Defaults to constants.BOOTSTRAP_SEED, a fresh
+                              seed if that is None.
+        workers (int, optional): Worker processes, 1 draws in this process.
+                                 Defaults to constants.BOOTSTRAP_WORKERS.
+
+    Returns:
+        tuple: Lower and upper bounds, shaped like `counts`.
+    """
+    resamples = resamples or constants.BOOTSTRAP_RESAMPLES
+    seed = constants.BOOTSTRAP_SEED if seed is None else seed
+    workers = workers or constants.BOOTSTRAP_WORKERS
+    counts = np.asarray(counts, dtype="int64")
+    if workers == 1:
+        samples = _resample(counts, resamples, seed, cumulative)
+    else:
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        chunks = [len(chunk) for chunk in np.array_split(np.arange(resamples), workers)]
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            samples = np.concatenate(list(pool.map(
+                _resample,
+                [counts] * workers,
+                chunks,
+                seeds,
+                [cumulative] * workers,
+            )))
+    alpha = 1 - confidence
+    low, high = np.nanquantile(samples, [alpha / 2, 1 - alpha / 2], axis=0)
+    return low, high
+
+
+# Method name mapped to a function(counts, confidence, cumulative) returning
+# lower and upper bounds.
+METHODS = {
+    "wilson": wilson,
+    "bootstrap": bootstrap,
+}
+
+
+def share_intervals(matrix, method=None, confidence=None, cumulative=False):
+    """Compute confidence intervals for every subgroup and answer of a count matrix.
+
+    Parameters:
+        matrix (pd.DataFrame): Counts as returned by `count_matrix`.
+        method (str, optional): Name of a method in `METHODS`.
+                                Defaults to constants.CONFIDENCE_METHOD.
+        confidence (float, optional): Confidence level.
+                                      Defaults to constants.CONFIDENCE_LEVEL.
+        cumulative (bool, optional): Intervals of the share of the first
+                                     answers up to each column instead.
+
+    Raises:
+        ValueError: If the method is unknown.
+
+    Returns:
+        dict: DataFrame with "share", "low" and "high" per answer, keyed by
+              subgroup.
+    """
+    method = method or constants.CONFIDENCE_METHOD
+    if method not in METHODS:
+        raise ValueError("Unknown confidence interval method {0}.".format(method))
+    counts = matrix.to_numpy()
+    low, high = METHODS[method](
+        counts, confidence or constants.CONFIDENCE_LEVEL, cumulative=cumulative
+    )
+    shares = _shares(counts.astype("float64"), cumulative)
+    return {
+        group: pd.DataFrame(
+            {"share": shares[row], "low": low[row], "high": high[row]},
+            index=matrix.columns,
+        )
+        for row, group in enumerate(matrix.index)
+    }
@@ -0,0 +1,342 @@
+"""Survey responses aggregated per source export and submission period."""
+# Import built-in modules
+import fnmatch
+import functools
+import json
+import logging
+import os
+import pickle
+
+# Import local modules
+import constants
+from scripts import file_utils
+from scripts.aggregation import SurveyCube
+
+
+logging.basicConfig(level=logging.INFO)
+
+_MANIFEST = "manifest.json"
+# Period of responses without a valid timestamp.
+UNKNOWN_PERIOD = "unknown"
+
+
+def source_id(file_path):
+    """Name the source export of a CSV file.
+
+    Downloaded exports are named after the ID at the end of their URL in
+    `constants.CSV_DOWNLOAD_LIST`, other files after their name.
+
+    Parameters:
+        file_path (str): Path of the CSV file.
+
+    Returns:
+        str: File name without extension.
+    """
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def partition_name(source, period):
+    """Join source and period into the name patterns are matched against.
+
+    Parameters:
+        source (str): Source export ID.
+        period (str): Submission period, e.g. "2023-10".
+
+    Returns:
+        str: Name like "mLZLNgcYGBwR8JJg/2023-10".
+    """
+    return "{0}/{1}".format(source, period)
+
+
+def period_names(timestamps):
+    """Name the submission period of every timestamp.
+
+    Periods are named like pandas prints them, e.g. "2023-10" per month.
+    Periods printed as a range, e.g. "2023-10-16/2023-10-22" per week, are
+    named by their first day instead, as the name is part of a file name.
+
+    Parameters:
+        timestamps (pd.Series): Submission timestamps.
+
+    Returns:
+        np.ndarray: Period names, UNKNOWN_PERIOD for missing timestamps.
+    """
+    periods = timestamps.dt.to_period(constants.PARTITION_PERIOD)
+    names = periods.astype("string")
+    if names.str.contains("/", regex=False).any():
+        names = periods.dt.start_time.dt.strftime("%Y-%m-%d").astype("string")
+    return names.fillna(UNKNOWN_PERIOD).to_numpy()
+
+
+def load_manifest(folder_path=constants.PARTITION_FOLDER):
+    """Load the manifest of the partitioned dataset.
+
+    Parameters:
+        folder_path (str, optional): Folder of the partitions.
+                                     Defaults to constants.PARTITION_FOLDER.
+
+    Returns:
+        dict: Signature of the CSV file and its partitions keyed by source,
+              empty if the partitions were built by a different schema or period.
+    """
+    try:
+        with open(os.path.join(folder_path, _MANIFEST), encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if (
+        manifest.get("schema") != file_utils.DATA_CACHE_SCHEMA
+        or manifest.get("period") != constants.PARTITION_PERIOD
+    ):
+        return {}
+    return manifest["sources"]
+
+
+def save_manifest(sources, folder_path=constants.PARTITION_FOLDER):
+    """Atomically write the manifest of the partitioned dataset.
+
+    Parameters:
+        sources (dict): Signature of the CSV file and its partitions keyed by source.
+        folder_path (str, optional): Folder of the partitions.
+                                     Defaults to constants.PARTITION_FOLDER.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    manifest_file = os.path.join(folder_path, _MANIFEST)
+    tmp_file = "{0}.tmp".format(manifest_file)
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump({
+            "schema": file_utils.DATA_CACHE_SCHEMA,
+            "period": constants.PARTITION_PERIOD,
+            "sources": sources,
+        }, file, indent=2, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+
+def _remove_partitions(entry, folder_path):
+    """Delete the aggregate files of a source.
+
+    Parameters:
+        entry (dict): Manifest entry of the source.
+        folder_path (str): Folder of the partitions.
+    """
+    for partition in entry["partitions"].values():
+        try:
+            os.remove(os.path.join(folder_path, partition["cube"]))
+        except FileNotFoundError:
+            pass
+
+
+def _build_source(file_path, source, folder_path):
+    """Split a CSV file into periods and save one aggregate per period.
+
+    Parameters:
+        file_path (str): Path of the CSV file.
+        source (str): Source export ID of the file.
+        folder_path (str): Folder of the partitions.
+
+    Returns:
+        dict: Manifest entry with the file signature and the rows, first
+              and last submission and aggregate file per period.
+    """
+    stat = os.stat(file_path)
+    csv_data = file_utils.replace_ger_eng(file_utils.read_survey_csv(file_path))
+    timestamps = file_utils.convert_timestamps(csv_data[constants.TIMESTAMP_COLUMN])
+    periods = period_names(timestamps)
+    os.makedirs(folder_path, exist_ok=True)
+    partitions = {}
+    for period, rows in csv_data.groupby(periods, sort=True):
+        cube_file = "{0}_{1}.pkl".format(source, period)
+        tmp_file = os.path.join(folder_path, "{0}.tmp".format(cube_file))
+        with open(tmp_file, "wb") as file:
+            pickle.dump(SurveyCube.from_frame(rows), file)
+        os.replace(tmp_file, os.path.join(folder_path, cube_file))
+        period_timestamps = timestamps[rows.index]
+        partitions[period] = {
+            "rows": len(rows),
+            "first": None if period_timestamps.isna().all() else period_timestamps.min().isoformat(),
+            "last": None if period_timestamps.isna().all() else period_timestamps.max().isoformat(),
+            "cube": cube_file,
+        }
+    logging.info("Partitioned {0} into {1} periods".format(file_path, len(partitions)))
+    return {
+        "file": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "partitions": partitions,
+    }
+
+
+def update(
+    folder_path=constants.DATA_FOLDER,
+    partition_folder=constants.PARTITION_FOLDER,
+    sources=None,
+):
+    """Bring the partitions of new or changed CSV files up to date.
+
+    A source is only read again when its file changed, partitions of
+    removed files are deleted.
+
+    Parameters:
+        folder_path (str, optional): Path to the folder containing CSV files.
+                                     Defaults to constants.DATA_FOLDER.
+        partition_folder (str, optional): Folder of the partitions.
+                                          Defaults to constants.PARTITION_FOLDER.
+        sources (set, optional): Source IDs to update, None updates all.
+                                 Other sources are kept as they are.
+
+    Returns:
+        dict: Manifest entries keyed by source.
+    """
+    previous_sources = load_manifest(partition_folder)
+    csv_files = {
+        source_id(file_path): file_path
+        for file_path in file_utils.list_csv_files(folder_path)
+    }
+    manifest = {}
+    for source, entry in previous_sources.items():
+        if source not in csv_files:
+            _remove_partitions(entry, partition_folder)
+        elif sources is not None and source not in sources:
+            manifest[source] = entry
+    for source, file_path in csv_files.items():
+        if sources is not None and source not in sources:
+            continue
+        entry = previous_sources.get(source)
+        stat = os.stat(file_path)
+        if (
+            entry
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and all(
+                os.path.isfile(os.path.join(partition_folder, partition["cube"]))
+                for partition in entry["partitions"].values()
+            )
+        ):
+            manifest[source] = entry
+            continue
+        if entry:
+            _remove_partitions(entry, partition_folder)
+        manifest[source] = _build_source(file_path, source, partition_folder)
+    save_manifest(manifest, partition_folder)
+    return manifest
+
+
+def _full_pattern(pattern):
+    """Extend a pattern without period to all periods of the source.
+
+    Parameters:
+        pattern (str): Pattern like "mLZLNgcYGBwR8JJg" or "*/2023-10".
+
+    Returns:
+        str: Pattern with a period part.
+    """
+    return pattern if "/" in pattern else "{0}/*".format(pattern)
+
+
+def select(manifest, patterns=None):
+    """List the partitions matching any of the given glob patterns.
+
+    Parameters:
+        manifest (dict): Manifest entries keyed by source.
+        patterns (list, optional): Patterns of `partition_name`, e.g.
+                                   "*/2023-1?", a pattern without "/" selects
+                                   all periods of a source. None selects all.
+
+    Returns:
+        list: Sorted (source, period) tuples.
+    """
+    return sorted(
+        (source, period)
+        for source, entry in manifest.items()
+        for period in entry["partitions"]
+        if patterns is None or any(
+            fnmatch.fnmatch(partition_name(source, period), _full_pattern(pattern))
+            for pattern in patterns
+        )
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _load_cube(cube_file, mtime_ns):
+    """Load an aggregate file once per modification.
+
+    Parameters:
+        cube_file (str): Path of the aggregate file.
+        mtime_ns (int): Modification time, part of the cache key.
+
+    Returns:
+        SurveyCube: Counts of the partition.
+    """
+    with open(cube_file, "rb") as file:
+        return pickle.load(file)
+
+
+def load(
+    patterns=None,
+    folder_path=constants.DATA_FOLDER,
+    partition_folder=constants.PARTITION_FOLDER,
+):
+    """Load the aggregates of the partitions matching the patterns.
+
+    Only sources with a matching partition are checked for changes and only
+    the aggregates of matching partitions are read.
+
+    Parameters:
+        patterns (list, optional): Glob patterns of `partition_name`.
+                                   None loads all partitions.
+        folder_path (str, optional): Path to the folder containing CSV files.
+                                     Defaults to constants.DATA_FOLDER.
+        partition_folder (str, optional): Folder of the partitions.
+                                          Defaults to constants.PARTITION_FOLDER.
+
+    Raises:
+        ValueError: If no partition matches the patterns.
+
+    Returns:
+        dict: SurveyCube keyed by (source, period), sorted.
+    """
+    sources = None
+    if patterns is not None:
+        # Sources that may contain matching partitions, also new ones.
+        source_patterns = [_full_pattern(pattern).split("/")[0] for pattern in patterns]
+        sources = {
+            source_id(file_path)
+            for file_path in file_utils.list_csv_files(folder_path)
+            if any(fnmatch.fnmatch(source_id(file_path), pattern) for pattern in source_patterns)
+        }
+    manifest = update(folder_path, partition_folder, sources)
+    keys = select(manifest, patterns)
+    if not keys:
+        raise ValueError("No partitions match {0}.".format(", ".join(patterns or ["*"])))
+    cubes = {}
+    for source, period in keys:
+        cube_file = os.path.join(partition_folder, manifest[source]["partitions"][period]["cube"])
+        cubes[(source, period)] = _load_cube(cube_file, os.stat(cube_file).st_mtime_ns)
+    return cubes
+
+
+def combine(cubes):
+    """Merge the aggregates of several partitions.
+
+    Parameters:
+        cubes (dict): SurveyCube keyed by (source, period).
+
+    Returns:
+        SurveyCube: Counts of all partitions.
+    """
+    return functools.reduce(SurveyCube.merge, cubes.values())
+
+
+def by_period(cubes):
+    """Merge the aggregates of all sources per period.
+
+    Parameters:
+        cubes (dict): SurveyCube keyed by (source, period).
+
+    Returns:
+        dict: SurveyCube keyed by period, sorted by period.
+    """
+    periods = {}
+    for (_, period), cube in sorted(cubes.items(), key=lambda item: item[0][1]):
+        periods[period] = periods[period].merge(cube) if period in periods else cube
+    return periods
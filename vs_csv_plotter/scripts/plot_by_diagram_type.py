@@ -4,20 +4,78 @@ import logging
 
 # Import local modules
 import constants
-from scripts import file_utils
+from scripts import export, file_utils, profiling, smoothing, stacking
 
 # Import third-party modules
 from matplotlib import pyplot as plt
 from matplotlib.dates import DayLocator, DateFormatter
-import numpy as np
 import seaborn as sns
-from scipy.interpolate import make_interp_spline
 
 
 logging.basicConfig(level=logging.INFO)
 
+# Styled figure per chart kind and rcParams per style, created once per process.
+_FIGURES = {}
+_STYLES = {}
+_active_style = None
 
-def save_or_show_plot(title, save=constants.SAVE_PLOT, show=constants.SHOW_PLOT):
+
+def _style_rc(style):
+    """Build the rcParams of a style once.
+
+    Parameters:
+        style (str): "pie" for matplotlib defaults with the description font,
+                     "seaborn" for the darkgrid seaborn theme.
+
+    Returns:
+        dict: rcParams of the style.
+    """
+    if style not in _STYLES:
+        with plt.rc_context():
+            plt.rcdefaults()
+            if style == "pie":
+                plt.rcParams["font.size"] = constants.DESCRIPTION_FONT["fontsize"]
+                plt.rcParams["font.family"] = constants.STANDART_FONTSTYLE.get_family()[0]
+            else:
+                sns.set(style="darkgrid")
+                set_sns_theme()
+            _STYLES[style] = dict(plt.rcParams)
+    return _STYLES[style]
+
+
+def _prepare_figure(kind, style):
+    """Activate a style and an empty figure for a chart.
+
+    The figure of each chart kind is created and styled once and only
+    cleared for the following charts of the same kind.
+
+    Parameters:
+        kind (str): Chart kind owning the figure.
+        style (str): Style passed to `_style_rc`.
+
+    Returns:
+        matplotlib.figure.Figure: Current figure with empty axes.
+    """
+    global _active_style  # noqa: WPS420 rcParams are process wide anyway
+    if _active_style != style:
+        plt.rcParams.update(_style_rc(style))
+        _active_style = style
+    if not constants.REUSE_FIGURES or constants.SHOW_PLOT:
+        return plt.figure(figsize=(constants.PLOTHEIGHT, constants.PLOTWIDTH))
+    fig = _FIGURES.get(kind)
+    if fig is None or not plt.fignum_exists(fig.number):
+        fig = plt.figure(figsize=(constants.PLOTHEIGHT, constants.PLOTWIDTH))
+        _FIGURES[kind] = fig
+    else:
+        plt.figure(fig.number)
+        for axes in fig.axes:
+            axes.cla()
+    return fig
+
+
+def save_or_show_plot(
+    title, save=constants.SAVE_PLOT, show=constants.SHOW_PLOT, kind=None, timestamp=None,
+):
     """Save or show a Matplotlib plot based on specified parameters.
 
     This function allows the user to customize the saving and displaying
@@ -28,11 +86,15 @@ def save_or_show_plot(title, save=constants.SAVE_PLOT, show=constants.SHOW_PLOT)
         title (str): Title of the Matplotlib plot.
         save (bool, optional): Defaults to constants.SAVE_PLOT.
         show (bool, optional): Defaults to constants.SHOW_PLOT.
+        kind (str, optional): Chart kind selecting the export policy.
+        timestamp (pd.Timestamp, optional): Newest submission shown in the
+                                            footnote, defaults to the
+                                            timestamp of the CSV files.
 
     """
     plt.title(title, constants.HEADLINE_FONT)
     plt.annotate(
-        file_utils.get_timestamp(),
+        file_utils.get_timestamp() if timestamp is None else file_utils.format_data_timestamp(timestamp),
         xy=(1, 0),
         xycoords="figure fraction",
         ha="right",
@@ -44,32 +106,28 @@ def save_or_show_plot(title, save=constants.SAVE_PLOT, show=constants.SHOW_PLOT)
     plt.gca().yaxis.label.set_color(constants.TEXTCOLOR)
     plt.gca().title.set_color(constants.TEXTCOLOR)
 
-    if save:
-        for extension in constants.PLOT_FILETYPE_LIST:
-            fig_file = "{0}/{1}/{2}.{1}".format(
-                constants.PLOT_FOLDER,
-                extension,
-                file_utils.sanitize_filename(title)
-            )
-            plt.savefig(fig_file, facecolor=constants.BACKGROUNDCOLOR)
-            logging.info("Saved {0}".format(fig_file))
+    if save or export.is_capturing():
+        with profiling.stage(title, "save"):
+            export.export_figure(plt.gcf(), title, policy=export.policy_for(kind))
     if show:
         plt.show()
-    plt.clf()
-    plt.close("all")
+    if plt.gcf() not in _FIGURES.values():
+        plt.clf()
+        plt.close()
 
 
-def pie(plot_data, title):
+def pie(plot_data, title, intervals=None, timestamp=None):
     """Generate a pie chart with customized styling.
 
     Parameters:
         plot_data (pd.Series): Data for the pie chart.
         title (str): Title of the pie chart.
+        intervals (pd.DataFrame, optional): "low" and "high" confidence bounds
+                                            of the share of each slice.
+        timestamp (pd.Timestamp, optional): Newest submission shown in the footnote.
 
     """
-    plt.figure(figsize=(constants.PLOTHEIGHT, constants.PLOTWIDTH))
-    plt.rcParams["font.size"] = constants.DESCRIPTION_FONT["fontsize"]
-    plt.rcParams["font.family"] = constants.STANDART_FONTSTYLE.get_family()[0]
+    _prepare_figure("pie", "pie")
     sorted_data = plot_data.sort_index()
     _, _, autopct = plt.pie(
         sorted_data,
@@ -79,6 +137,10 @@ def pie(plot_data, title):
         colors=constants.CUSTOM_COLORS,
         textprops={"color": constants.TEXTCOLOR},
     )
+    if intervals is not None:
+        bounds = intervals.reindex(sorted_data.index)[["low", "high"]].to_numpy()
+        for text, (low, high) in zip(autopct, bounds):
+            text.set_text("{0}\n[{1:.1%} – {2:.1%}]".format(text.get_text(), low, high))
     for autopct in autopct:
         plt.annotate(
             autopct.get_text(),
@@ -90,7 +152,7 @@ def pie(plot_data, title):
             color = constants.TEXTCOLOR
         )
     plt.gca().set_facecolor(constants.BACKGROUNDCOLOR) 
-    save_or_show_plot(title)
+    save_or_show_plot(title, kind="pie", timestamp=timestamp)
 
 
 def line_with_mean(
@@ -101,19 +163,27 @@ def line_with_mean(
     x_value_label = "x",
     y_value_label = "y",
     mean_list = None,
-    mean = None
+    mean = None,
+    weights = None,
+    smoother = constants.SMOOTHER,
+    timestamp = None,
 ):
     """Generate a seaborn line plot with mean annotations.
 
+    The "Average Smoothed" line is the weighted average of the groups per
+    x value, smoothed over an evenly spaced grid.
+
     Args:
         plot_data (pd.DataFrame): DataFrame containing data for plotting.
         mean_list (list): List of tuples with labels and corresponding mean values.
         title (str): Title for the plot.
+        weights (dict): Weight of each group in the average, e.g. its number
+                        of responses. Defaults to equal weights.
+        smoother (str): Name of a smoother in `smoothing.SMOOTHERS`.
+        timestamp (pd.Timestamp): Newest submission shown in the footnote.
 
     """
-    plt.figure(figsize=(constants.PLOTHEIGHT, constants.PLOTWIDTH))
-    sns.set(style="darkgrid")
-    set_sns_theme()
+    _prepare_figure("line_with_mean", "seaborn")
     if plot_data_key:
         for plot_data_label, color in zip(plot_data[plot_data_key].unique(), constants.CUSTOM_COLORS):
             subset_data = plot_data[plot_data[plot_data_key] == plot_data_label]
@@ -123,11 +193,12 @@ def line_with_mean(
                 label=f"{plot_data_key} {plot_data_label}",
                 linewidth=constants.PLOTWIDTH/4
             )
-    x = np.arange(len(plot_data[x_axis_key]))
-    y = plot_data[x_axis_key]
-    spl = make_interp_spline(x, y, k=3)
-    smoothed_x = np.linspace(x.min(), x.max(), 300)
-    smoothed_y = spl(smoothed_x)
+        average = smoothing.weighted_average(plot_data, x_axis_key, plot_data_key, weights)
+    else:
+        average = plot_data[x_axis_key].sort_index()
+    smoothed_x, smoothed_y = smoothing.smooth(
+        average, smoother, constants.SMOOTHING_POINTS
+    )
     sns.lineplot(
         x=smoothed_x,
         y=smoothed_y,
@@ -169,10 +240,13 @@ def line_with_mean(
     plt.ylabel(y_value_label, color=constants.TEXTCOLOR)
     plt.gca().set_facecolor(constants.BACKGROUNDCOLOR)
     plt.subplots_adjust(top=0.9, bottom=0.125)
-    save_or_show_plot(title)
+    save_or_show_plot(title, kind="line_with_mean", timestamp=timestamp)
 
 
-def plot_line_chart(df, categories, title, x_value, y_value, x_label, y_label, xlim=(1, 10), ylim=(0, 1)):
+def plot_line_chart(
+    df, categories, title, x_value, y_value, x_label, y_label, xlim=(1, 10), ylim=(0, 1),
+    timestamp=None,
+):
     """Generate plot of a line chart.
     Args:
         row_index (str): The column in the DataFrame used as the category.
@@ -185,10 +259,9 @@ def plot_line_chart(df, categories, title, x_value, y_value, x_label, y_label, x
         y_label (str): Label for the y-axis.
         xlim (tuple): Tuple specifying the x-axis limits (default: (1, 10)).
         ylim (tuple): Tuple specifying the y-axis limits (default: (0, 1)).
+        timestamp (pd.Timestamp): Newest submission shown in the footnote.
     """
-    plt.figure(figsize=(constants.PLOTHEIGHT, constants.PLOTWIDTH))
-    sns.set(style="darkgrid")
-    set_sns_theme()
+    _prepare_figure("line", "seaborn")
 
     for i, category in enumerate(categories):
         plt.plot(df[x_value],
@@ -219,10 +292,13 @@ def plot_line_chart(df, categories, title, x_value, y_value, x_label, y_label, x
     plt.ylabel(y_label, color=constants.TEXTCOLOR)
     plt.gca().set_facecolor(constants.BACKGROUNDCOLOR)
     plt.subplots_adjust(top=0.9, bottom=0.125)
-    save_or_show_plot(title)
+    save_or_show_plot(title, kind="line", timestamp=timestamp)
 
 
-def plot_stack_chart(row_index, df, categories, title, x_value, y_value, x_label, y_label, xlim=(1, 10), ylim=(0, 1)):
+def plot_stack_chart(
+    row_index, df, categories, title, x_value, y_value, x_label, y_label,
+    xlim=(1, 10), ylim=(0, 1), bands=None, xticks=None, timestamp=None,
+):
     """Generate a stack chart.
     Args:
         row_index (str): The column in the DataFrame used as the category.
@@ -235,39 +311,39 @@ def plot_stack_chart(row_index, df, categories, title, x_value, y_value, x_label
         y_label (str): Label for the y-axis.
         xlim (tuple): Tuple specifying the x-axis limits (default: (1, 10)).
         ylim (tuple): Tuple specifying the y-axis limits (default: (0, 1)).
+        bands (pd.DataFrame): Confidence intervals of the upper layer edges with
+                              x_value, "share", "low" and "high" columns.
+        xticks (tuple): Positions and labels of the x-axis ticks, e.g. for
+                        categorical x values.
+        timestamp (pd.Timestamp): Newest submission shown in the footnote.
     """
-    plt.figure(figsize=(constants.PLOTHEIGHT, constants.PLOTWIDTH))
-    sns.set(style="darkgrid")
-    set_sns_theme()
-    x_data = df[x_value]
-    y_data = [
-        np.interp(
-            x_data, df[df[row_index] == category][x_value],
-            df[df[row_index] == category][y_value]
-        ) for category in categories
-    ]
+    _prepare_figure("stack", "seaborn")
+    x_data, bounds = stacking.stack_layers(df, row_index, categories, x_value, y_value)
     hatch_patterns = ["//", "\\", "||"]
-    for i, category_data in enumerate(y_data):
-        if i == 0:
-            plt.fill_between(
-                x_data,
-                0,
-                category_data,
-                label=categories[i],
-                color=constants.CUSTOM_COLORS[i],
-                hatch = hatch_patterns[i]
-            )
-        else:
-            plt.fill_between(
-                x_data,
-                np.sum(y_data[:i],axis=0),
-                np.sum(y_data[:i+1], axis=0),
-                label=categories[i],
-                color=constants.CUSTOM_COLORS[i],
-                hatch = hatch_patterns[i]
-            )
+    for i, category in enumerate(categories):
+        plt.fill_between(
+            x_data,
+            bounds[i],
+            bounds[i + 1],
+            label=category,
+            color=constants.CUSTOM_COLORS[i % len(constants.CUSTOM_COLORS)],
+            hatch = hatch_patterns[i % len(hatch_patterns)]
+        )
+    if bands is not None:
+        plt.errorbar(
+            bands[x_value],
+            bands["share"],
+            yerr=[bands["share"] - bands["low"], bands["high"] - bands["share"]],
+            fmt="none",
+            ecolor=constants.TEXTCOLOR,
+            elinewidth=constants.PLOTWIDTH / 8,
+            capsize=constants.PLOTWIDTH / 2,
+            label="{0:.0%} confidence interval".format(constants.CONFIDENCE_LEVEL),
+        )
     plt.xlim(*xlim)
     plt.ylim(*ylim)
+    if xticks is not None:
+        plt.xticks(*xticks)
     plt.yticks(list(plt.yticks()[0]), [f"{tick:.0%}" for tick in plt.yticks()[0]])
     plt.gca().xaxis.label.set_color(constants.TEXTCOLOR)
     plt.gca().yaxis.label.set_color(constants.TEXTCOLOR)
@@ -282,7 +358,7 @@ def plot_stack_chart(row_index, df, categories, title, x_value, y_value, x_label
     plt.ylabel(y_label, color=constants.TEXTCOLOR)
     plt.gca().set_facecolor(constants.BACKGROUNDCOLOR)
     plt.subplots_adjust(top=0.9, bottom=0.125)
-    save_or_show_plot(title)
+    save_or_show_plot(title, kind="stack", timestamp=timestamp)
 
 
 def set_sns_theme():
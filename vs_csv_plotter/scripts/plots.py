@@ -1,77 +1,96 @@
 """Plots from current survey."""
 # Import local modules
 import constants
-from scripts import file_utils
-from scripts import plot_by_diagram_type as plot
+from scripts import intervals, partitions
+from scripts.charts import ChartSpec
 
 # Import third-party modules
 import pandas as pd
 
 
-def plot_financial_impact(csv_data):
+def plot_financial_impact(cube):
     """Generate a line plot comparing the financial impact ratings.
 
     Parameters:
-        csv_data (pd.DataFrame): DataFrame with survey data.
+        cube (aggregation.SurveyCube): Aggregated survey data.
 
+    Returns:
+        list: ChartSpecs of the generated charts.
     """
-    row_index = (
-        "Wie stark würde dich das vollsolidarische bundesweite Semesterticket "
-        + "finanziell treffen? (Skala 1 (kein/kleines Problem) - 10 (nicht finanzierbar))"
-    )
-    over_26_data = csv_data[csv_data["Altersklasse"] == "> 26"]
-    under_26_data = csv_data[csv_data["Altersklasse"] == "≤ 26"]
+    row_index = constants.RATING_COLUMN
+    over_26_data = cube.where(constants.AGE_COLUMN, constants.OVER_26)
+    under_26_data = cube.where(constants.AGE_COLUMN, constants.UNDER_26)
     plot_data_over_26 = pd.DataFrame({
-        "Rating": over_26_data[row_index].value_counts() / len(over_26_data),
+        "Rating": over_26_data.value_counts(row_index) / over_26_data.total(),
         "Age Group": "> 26"
     })
     plot_data_under_26 = pd.DataFrame({
-        "Rating": under_26_data[row_index].value_counts() /len(under_26_data),
+        "Rating": under_26_data.value_counts(row_index) / under_26_data.total(),
         "Age Group": "≤ 26"
     })
-    mean = csv_data[row_index].mean()
-    mean_over_26 = over_26_data[row_index].mean()
-    mean_under_26 = under_26_data[row_index].mean()
+    mean = cube.mean(row_index)
+    mean_over_26 = over_26_data.mean(row_index)
+    mean_under_26 = under_26_data.mean(row_index)
     mean_list = [("> 26", mean_over_26), ("≤ 26", mean_under_26)]
     plot_data = pd.concat([plot_data_over_26, plot_data_under_26])
-    plot.line_with_mean(
-        plot_data,
-        "Rating",
-        "Self rated financial Impact of solidarity ticket",
-        plot_data_key = "Age Group",
-        x_value_label = "Rating (Scale 1 (no/minor problem) - 10 (cannot be financed))",
-        y_value_label = "Percent",
-        mean_list = mean_list,
-        mean=mean
-    )
-
-
-def plot_participation(csv_data):
+    return [ChartSpec(
+        name="financial_impact",
+        kind="line_with_mean",
+        title="Self rated financial Impact of solidarity ticket",
+        data=plot_data,
+        options={
+            "x_axis_key": "Rating",
+            "plot_data_key": "Age Group",
+            "x_value_label": "Rating (Scale 1 (no/minor problem) - 10 (cannot be financed))",
+            "y_value_label": "Percent",
+            "mean_list": mean_list,
+            "mean": mean,
+            "weights": {"> 26": over_26_data.total(), "≤ 26": under_26_data.total()},
+            "smoother": constants.SMOOTHER,
+        },
+    )]
+
+
+def plot_participation(cube):
     """Plot the participation compared to all students.
 
     Parameters:
-        csv_data (pd.DataFrame): DataFrame containing survey data.
+        cube (aggregation.SurveyCube): Aggregated survey data.
 
+    Returns:
+        list: ChartSpecs of the generated charts.
     """
-    num_participants = len(csv_data)-1
+    num_participants = cube.total()-1
     plot_values = [constants.STUDENTS - num_participants, num_participants]
     labels = ["Non-Participants", "Participants"]
     part_data = pd.Series(plot_values, index=labels)
-    plot.pie(part_data, "Participation of all HdM students")
+    return [ChartSpec(
+        name="participation",
+        kind="pie",
+        title="Participation of all HdM students",
+        data=part_data,
+    )]
 
 
-def plot_age_distribution(csv_data):
+def plot_age_distribution(cube):
     """Plot the age distribution based on survey data.
 
     Parameters:
-        csv_data (pd.DataFrame): DataFrame containing survey data.
+        cube (aggregation.SurveyCube): Aggregated survey data.
 
+    Returns:
+        list: ChartSpecs of the generated charts.
     """
-    age_counts = csv_data["Altersklasse"].value_counts()
-    plot.pie(age_counts, "Age Distribution of participants")
+    age_counts = cube.value_counts(constants.AGE_COLUMN)
+    return [ChartSpec(
+        name="age_distribution",
+        kind="pie",
+        title="Age Distribution of participants",
+        data=age_counts,
+    )]
 
 
-def plot_ticket_data(csv_data):  # noqa: WPS210 As splitting up wouldn"t make sense
+def plot_ticket_data(cube):  # noqa: WPS210 As splitting up wouldn"t make sense
     """Plot ticket-related data based on survey responses.
 
     This function generates three pie charts illustrating ticket-related
@@ -81,47 +100,55 @@ def plot_ticket_data(csv_data):  # noqa: WPS210 As splitting up wouldn"t make se
     3. "Do you currently have the JugendBW-Ticket? (≤26)"
 
     Parameters:
-        csv_data (pd.DataFrame): DataFrame containing survey data.
+        cube (aggregation.SurveyCube): Aggregated survey data.
 
+    Returns:
+        list: ChartSpecs of the generated charts.
     """
-    row_index = (
-        "Beziehst du aktuell das Jugendticket BW / "
-        + "Würdest du das Jugendticket BW beziehen wenn du berechtigt wärst?"
-    )
-    d_ticket_index = "Beziehst du aktuell das Deutschlandticket (49 € Ticket)?"
+    row_index = constants.YOUTH_TICKET_COLUMN
+    d_ticket_index = constants.D_TICKET_COLUMN
 
-    over_26_data = csv_data[csv_data["Altersklasse"] == "> 26"]
-    under_26_data = csv_data[csv_data["Altersklasse"] == "≤ 26"]
+    over_26_data = cube.where(constants.AGE_COLUMN, constants.OVER_26)
+    under_26_data = cube.where(constants.AGE_COLUMN, constants.UNDER_26)
 
-    over_26_count = over_26_data[row_index].value_counts()
-    over_26_d_ticket_count = over_26_data[d_ticket_index].value_counts()
+    over_26_count = over_26_data.value_counts(row_index)
+    over_26_d_ticket_count = over_26_data.value_counts(d_ticket_index)
 
-    under_26_count = under_26_data[row_index].value_counts()
-    under_26_no_youth_ticket = under_26_data[under_26_data[row_index] == "No"]
-    under_26_d_ticket = under_26_no_youth_ticket[d_ticket_index].value_counts()
+    under_26_count = under_26_data.value_counts(row_index)
+    under_26_no_youth_ticket = under_26_data.where(row_index, "No")
+    under_26_d_ticket = under_26_no_youth_ticket.value_counts(d_ticket_index)
     removed_no = under_26_count.drop("No", errors="ignore")
     under_26_d_ticket = under_26_d_ticket.rename(index={"Yes": "No, D-Ticket"})
     combined_under_26 = removed_no.add(under_26_d_ticket, fill_value=0)
 
-    support_with_d_ticket = over_26_data[over_26_data[row_index] == "Yes"]
-    support_with_d_ticket_counts = support_with_d_ticket[d_ticket_index].value_counts()
-
-    plot.pie(
-        over_26_count, "Would you buy a JugendBW-Ticket if eligible? (>26)"
-    )
-    plot.pie(
-        over_26_d_ticket_count, "Do you own a D-Ticket? (>26)"
-    )
-    plot.pie(
-        combined_under_26, "Do you currently have a JugendBW-Ticket? (≤26)"
-    )
-    plot.pie(
-        support_with_d_ticket_counts,
-        "Owning a D-Ticket while being interested in JugendBW-Ticket? (>26)"
-    )
+    support_with_d_ticket = over_26_data.where(row_index, "Yes")
+    support_with_d_ticket_counts = support_with_d_ticket.value_counts(d_ticket_index)
+
+    pie_data = {
+        "ticket_youth_ticket_over_26": (
+            over_26_count,
+            "Would you buy a JugendBW-Ticket if eligible? (>26)",
+        ),
+        "ticket_d_ticket_over_26": (
+            over_26_d_ticket_count,
+            "Do you own a D-Ticket? (>26)",
+        ),
+        "ticket_youth_ticket_under_26": (
+            combined_under_26,
+            "Do you currently have a JugendBW-Ticket? (≤26)",
+        ),
+        "ticket_d_ticket_youth_ticket_interest_over_26": (
+            support_with_d_ticket_counts,
+            "Owning a D-Ticket while being interested in JugendBW-Ticket? (>26)",
+        ),
+    }
+    return [
+        ChartSpec(name=name, kind="pie", title=title, data=data)
+        for name, (data, title) in pie_data.items()
+    ]
 
 
-def plot_support_data(csv_data):
+def plot_support_data(cube):
     """Plot general support for Ticket.
     
     1. Everyone
@@ -129,100 +156,211 @@ def plot_support_data(csv_data):
     3. above 26
 
     Parameters:
-        csv_data (pd.DataFrame): DataFrame containing survey data.
+        cube (aggregation.SurveyCube): Aggregated survey data.
 
+    Returns:
+        list: ChartSpecs of the generated charts.
     """
-    row_index = (
-        "Würdest du ein vollsolidarisches Deutschlandticket unterstützen?"
-    )
+    row_index = constants.SUPPORT_COLUMN
+    wealth_index = constants.RATING_COLUMN
 
-    wealth_index = (
-        "Wie stark würde dich das vollsolidarische bundesweite Semesterticket "
-        +"finanziell treffen? (Skala 1 (kein/kleines Problem) - 10 (nicht finanzierbar))"
-    )
+    over_26_data = cube.where(constants.AGE_COLUMN, constants.OVER_26)
+    under_26_data = cube.where(constants.AGE_COLUMN, constants.UNDER_26)
 
-    support_counts = {
-        ">26": csv_data[csv_data["Altersklasse"] == "> 26"][row_index].value_counts(),
-        "All Ages": csv_data[row_index].value_counts(),
-        "≤26": csv_data[csv_data["Altersklasse"] == "≤ 26"][row_index].value_counts(),
-        "Financially not affected (Self Rated <4)": csv_data[csv_data[wealth_index] < 4][row_index].value_counts(),
-        "Financially affected (Self Rated >7)": csv_data[csv_data[wealth_index] > 7][row_index].value_counts(),
-        "Financially affected (Self Rated >7) (>26)": csv_data[(csv_data[wealth_index] > 7) & (csv_data["Altersklasse"] == "> 26")][row_index].value_counts(),
-        "Financially not affected (Self Rated <4) (>26)": csv_data[(csv_data[wealth_index] < 4) & (csv_data["Altersklasse"] == "> 26")][row_index].value_counts(),
-        "Financially affected (Self Rated >7) (≤26)": csv_data[(csv_data[wealth_index] > 7) & (csv_data["Altersklasse"] == "≤ 26")][row_index].value_counts(),
-        "Financially not affected (Self Rated <4) (≤26)": csv_data[(csv_data[wealth_index] < 4) & (csv_data["Altersklasse"] == "≤ 26")][row_index].value_counts(),
-    }
+    def not_affected(rating):
+        return rating < 4
 
-    for label, data_count in support_counts.items():
-        plot.pie(data_count, f"Would you support a full solidarity ticket for Germany? ({label})")
+    def affected(rating):
+        return rating > 7
 
+    support_counts = {
+        # Key is (chart name, subgroup label).
+        ("support_over_26", ">26"): over_26_data.value_counts(row_index),
+        ("support_all_ages", "All Ages"): cube.value_counts(row_index),
+        ("support_under_26", "≤26"): under_26_data.value_counts(row_index),
+        ("support_not_affected", "Financially not affected (Self Rated <4)"): cube.where(wealth_index, not_affected).value_counts(row_index),
+        ("support_affected", "Financially affected (Self Rated >7)"): cube.where(wealth_index, affected).value_counts(row_index),
+        ("support_affected_over_26", "Financially affected (Self Rated >7) (>26)"): over_26_data.where(wealth_index, affected).value_counts(row_index),
+        ("support_not_affected_over_26", "Financially not affected (Self Rated <4) (>26)"): over_26_data.where(wealth_index, not_affected).value_counts(row_index),
+        ("support_affected_under_26", "Financially affected (Self Rated >7) (≤26)"): under_26_data.where(wealth_index, affected).value_counts(row_index),
+        ("support_not_affected_under_26", "Financially not affected (Self Rated <4) (≤26)"): under_26_data.where(wealth_index, not_affected).value_counts(row_index),
+    }
 
-def plot_support_data_vs_financial_impact(csv_data):
+    share_intervals = {}
+    if constants.CONFIDENCE_INTERVALS:
+        # One computation for all subgroups.
+        share_intervals = intervals.share_intervals(intervals.count_matrix({
+            name: data_count for (name, _), data_count in support_counts.items()
+        }))
+
+    return [
+        ChartSpec(
+            name=name,
+            kind="pie",
+            title=f"Would you support a full solidarity ticket for Germany? ({label})",
+            data=data_count,
+            options={"intervals": share_intervals[name]} if share_intervals else {},
+        )
+        for (name, label), data_count in support_counts.items()
+    ]
+
+
+def plot_support_data_vs_financial_impact(cube):
     """Plot support for full solidarity ticket vs. financial impact.
 
     This function generates a line plot comparing the support for a full solidarity ticket
     with the financial impact ratings, for both age groups.
 
     Parameters:
-        csv_data (pd.DataFrame): DataFrame with survey data.
+        cube (aggregation.SurveyCube): Aggregated survey data.
 
+    Returns:
+        list: ChartSpecs of the generated charts.
     """
-    row_index = (
-        "Würdest du ein vollsolidarisches Deutschlandticket unterstützen?"
-    )
-
-    wealth_index = (
-        "Wie stark würde dich das vollsolidarische bundesweite Semesterticket "
-        +"finanziell treffen? (Skala 1 (kein/kleines Problem) - 10 (nicht finanzierbar))"
-    )
+    row_index = constants.SUPPORT_COLUMN
+    wealth_index = constants.RATING_COLUMN
 
-    csv_dict = {
-        "(All Ages)": csv_data,
-        "(>26)":csv_data[csv_data["Altersklasse"] == "> 26"],
-        "(≤26)":csv_data[csv_data["Altersklasse"] == "≤ 26"]
+    cube_dict = {
+        ("all_ages", "(All Ages)"): cube,
+        ("over_26", "(>26)"): cube.where(constants.AGE_COLUMN, constants.OVER_26),
+        ("under_26", "(≤26)"): cube.where(constants.AGE_COLUMN, constants.UNDER_26)
     }
-    for label, csv_data in csv_dict.items():
-        df = pd.DataFrame()
-        for wealth_value in range(1, 11):
-            data = csv_data[csv_data[wealth_index] == wealth_value]
-            support_count = data[row_index].value_counts().reset_index()
-            support_count.columns = [row_index, "count"]
-            support_count["relative_count"] = support_count["count"] / len(data)
-            support_count["wealth_index"] = wealth_value
-            df = pd.concat([df, support_count], ignore_index=True)
+    specs = []
+    layer_counts = {}
+    for (name, label), subset in cube_dict.items():
+        rated = subset.where(wealth_index, lambda rating: rating.isin(range(1, 11)))
+        df = rated.counts(wealth_index, row_index).reset_index()
+        df.columns = ["wealth_index", row_index, "count"]
+        df = df.sort_values(
+            ["wealth_index", "count"], ascending=[True, False], kind="stable"
+        )
+        df["relative_count"] = df["count"] / df["wealth_index"].map(
+            rated.counts(wealth_index)
+        )
+        df["wealth_index"] = df["wealth_index"].astype("int64")
+        df = df[[row_index, "count", "relative_count", "wealth_index"]].reset_index(drop=True)
 
         categories = df[row_index].unique()
+        if constants.CONFIDENCE_INTERVALS:
+            # Counts per rating with the answers in stacking order.
+            layers = df.pivot_table(
+                index="wealth_index", columns=row_index, values="count", fill_value=0
+            ).reindex(columns=categories, fill_value=0)
+            # Rated responses without a support answer count towards the
+            # relative counts like above, as a last layer that is not drawn.
+            rated_totals = rated.counts(wealth_index)
+            rated_totals.index = rated_totals.index.astype("int64")
+            layers["unanswered"] = rated_totals.reindex(layers.index) - layers.sum(axis=1)
+            layers.columns = range(len(categories) + 1)
+            layer_counts[name] = layers
         title = f"Support for full solidarity ticket over financial situation {label} (self Rated)"
         x_value = "wealth_index"
         y_value = "relative_count"
         x_label = "Rating (Scale 1 (no/minor problem) - 10 (cannot be financed))"
         y_label = "Percent"
 
-        plot.plot_stack_chart(row_index, df, categories, title, x_value, y_value, x_label, y_label)
-
-
-def plot_participation_over_time(data):
+        specs.append(ChartSpec(
+            name=f"support_vs_financial_impact_{name}",
+            kind="stack",
+            title=title,
+            data=df,
+            options={
+                "row_index": row_index,
+                "categories": categories,
+                "x_value": x_value,
+                "y_value": y_value,
+                "x_label": x_label,
+                "y_label": y_label,
+            },
+        ))
+
+    if layer_counts:
+        # One computation for all ratings of all subsets, the interval of a
+        # layer's upper edge is the one of the cumulative share.
+        matrix = pd.concat(layer_counts).fillna(0).astype("int64")
+        edge_intervals = intervals.share_intervals(matrix, cumulative=True)
+        for spec, (name, _) in zip(specs, cube_dict):
+            # The upper edge of the top layer is 100% unless answers are missing.
+            spec.options["bands"] = pd.concat({
+                rating: edge_intervals[(name, rating)].iloc[:len(spec.options["categories"]) - 1]
+                for rating in layer_counts[name].index
+            }, names=["wealth_index", "layer"]).reset_index()
+    return specs
+
+
+def plot_participation_over_time(cube):
     """Plot participation over time.
 
-    This function generates a line plot comparing the support for a full solidarity ticket
-    with the financial impact ratings, for both age groups.
+    This function generates a line plot of the cumulative number of participants
+    over the submission time.
 
     Parameters:
-        csv_data (pd.DataFrame): DataFrame with survey data.
+        cube (aggregation.SurveyCube): Aggregated survey data.
 
+    Returns:
+        list: ChartSpecs of the generated charts.
     """
-    df = pd.DataFrame()
-    df["Zeitstempel"] = data["Zeitstempel"].apply(file_utils.convert_timestamp)
-    df = df.sort_values(by="Zeitstempel")
-    df["Participation"] = range(1, len(df) + 1)
-    plot.plot_line_chart(
-        df=df,
-        categories=["Participation"],
+    df = pd.DataFrame({
+        "Zeitstempel": cube.timeline.index,
+        "Participation": cube.timeline.cumsum().to_numpy(),
+    })
+    return [ChartSpec(
+        name="participation_over_time",
+        kind="line",
         title="Participation Over Time",
-        x_value="Zeitstempel",
-        y_value="Participation",
-        x_label="Time",
-        y_label="Cumulative Number of Participants",
-        xlim=(min(df["Zeitstempel"]), max(df["Zeitstempel"])),
-        ylim=(0, max(df["Participation"]) + 10)
+        data=df,
+        options={
+            "categories": ["Participation"],
+            "x_value": "Zeitstempel",
+            "y_value": "Participation",
+            "x_label": "Time",
+            "y_label": "Cumulative Number of Participants",
+            "xlim": (min(df["Zeitstempel"]), max(df["Zeitstempel"])),
+            "ylim": (0, max(df["Participation"]) + 10),
+        },
+    )]
+
+
+def plot_support_by_period(partition_cubes):
+    """Plot the support for a full solidarity ticket per submission period.
+
+    The responses of all selected source exports are combined per period,
+    so survey waves can be compared.
+
+    Parameters:
+        partition_cubes (dict): Aggregated survey data keyed by
+                                (source export, period).
+
+    Returns:
+        list: ChartSpecs of the generated charts, none for a single period.
+    """
+    row_index = constants.SUPPORT_COLUMN
+    period_cubes = partitions.by_period(partition_cubes)
+    if len(period_cubes) < 2:
+        return []
+    counts = pd.DataFrame({
+        period: cube.counts(row_index) for period, cube in period_cubes.items()
+    }).T.fillna(0)
+    shares = counts.div(counts.sum(axis=1), axis=0).fillna(0)
+    # Most common answer at the bottom, like the other stack charts.
+    categories = list(counts.sum().sort_values(ascending=False, kind="stable").index)
+    shares.index = range(1, len(shares) + 1)
+    df = shares.rename_axis("period_index").reset_index().melt(
+        id_vars="period_index", var_name=row_index, value_name="relative_count"
     )
+    return [ChartSpec(
+        name="support_by_period",
+        kind="stack",
+        title="Support for full solidarity ticket per submission period",
+        data=df,
+        options={
+            "row_index": row_index,
+            "categories": categories,
+            "x_value": "period_index",
+            "y_value": "relative_count",
+            "x_label": "Submission period",
+            "y_label": "Percent",
+            "xlim": (1, len(period_cubes)),
+            "xticks": (list(shares.index), list(period_cubes)),
+        },
+    )]
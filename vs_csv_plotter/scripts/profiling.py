@@ -0,0 +1,233 @@
+"""Timing and memory measurements of the plotting stages."""
+# Import built-in modules
+import contextlib
+import csv
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+
+logging.basicConfig(level=logging.INFO)
+
+# Settings of the running profiler, None while profiling is off.
+_settings = None
+# Finished stages as dicts, see `stage`.
+_events = []
+_events_lock = threading.Lock()
+# Stack of open stages per thread, used to pass memory peaks to the parent.
+_local = threading.local()
+
+_CSV_FIELDS = [
+    "name", "category", "start", "duration", "peak_memory", "pid", "thread"
+]
+
+
+def enable(memory=False):
+    """Start recording stages.
+
+    Parameters:
+        memory (bool, optional): Also trace the peak memory allocated by
+                                 Python per stage, this slows the run down.
+    """
+    global _settings  # noqa: WPS420 The profiler is process wide
+    _settings = {"memory": memory}
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Stop recording stages, recorded stages are kept."""
+    global _settings  # noqa: WPS420 The profiler is process wide
+    if _settings and _settings["memory"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _settings = None
+
+
+def settings():
+    """Return the settings to enable the profiler with in worker processes.
+
+    Returns:
+        dict: Keyword arguments of `enable`, None while profiling is off.
+    """
+    return dict(_settings) if _settings else None
+
+
+def is_enabled():
+    """Check whether stages are recorded.
+
+    Returns:
+        bool: True if the profiler is enabled.
+    """
+    return _settings is not None
+
+
+@contextlib.contextmanager
+def stage(name, category="stage"):
+    """Measure the duration and peak memory of a block.
+
+    Does nothing while the profiler is disabled. Stages can be nested, the
+    peak memory of a stage includes the peaks of its nested stages.
+
+    Parameters:
+        name (str): Name of the stage, e.g. a function or chart name.
+        category (str, optional): Group of the stage like "analysis" or "render".
+
+    Yields:
+        None
+    """
+    if _settings is None:
+        yield
+        return
+    trace_memory = _settings["memory"] and tracemalloc.is_tracing()
+    stack = _local.__dict__.setdefault("stack", [])
+    if trace_memory:
+        if stack:
+            stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    stack.append(0)
+    start = time.time()
+    start_counter = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start_counter
+        nested_peak = stack.pop()
+        peak_memory = None
+        if trace_memory:
+            peak_memory = max(nested_peak, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1] = max(stack[-1], peak_memory)
+            tracemalloc.reset_peak()
+        record({
+            "name": name,
+            "category": category,
+            "start": start,
+            "duration": duration,
+            "peak_memory": peak_memory,
+            "pid": os.getpid(),
+            "thread": threading.get_ident(),
+        })
+
+
+def record(*events):
+    """Add finished stages, e.g. the ones measured in worker processes.
+
+    Parameters:
+        *events (dict): Stages as recorded by `stage`.
+    """
+    with _events_lock:
+        _events.extend(events)
+
+
+def drain():
+    """Remove and return all recorded stages.
+
+    Returns:
+        list: Recorded stages in the order they finished.
+    """
+    with _events_lock:
+        events = list(_events)
+        _events.clear()
+    return events
+
+
+def summarize(events):
+    """Add up the stages sharing a category and name.
+
+    Parameters:
+        events (list): Recorded stages.
+
+    Returns:
+        list: Count, total and longest duration and the highest peak memory per
+              category and name, the most expensive first.
+    """
+    totals = {}
+    for event in events:
+        key = (event["category"], event["name"])
+        total = totals.setdefault(key, {
+            "category": event["category"],
+            "name": event["name"],
+            "count": 0,
+            "total_duration": 0.0,
+            "max_duration": 0.0,
+            "peak_memory": None,
+        })
+        total["count"] += 1
+        total["total_duration"] += event["duration"]
+        total["max_duration"] = max(total["max_duration"], event["duration"])
+        if event["peak_memory"] is not None:
+            total["peak_memory"] = max(total["peak_memory"] or 0, event["peak_memory"])
+    return sorted(totals.values(), key=lambda total: total["total_duration"], reverse=True)
+
+
+def chrome_trace(events):
+    """Convert stages to the Chrome trace event format.
+
+    The result can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+    Parameters:
+        events (list): Recorded stages.
+
+    Returns:
+        dict: Complete ("X") events with microsecond timestamps.
+    """
+    origin = min((event["start"] for event in events), default=0)
+    trace_events = []
+    for event in events:
+        trace_event = {
+            "name": event["name"],
+            "cat": event["category"],
+            "ph": "X",
+            "ts": (event["start"] - origin) * 1e6,
+            "dur": event["duration"] * 1e6,
+            "pid": event["pid"],
+            "tid": event["thread"],
+        }
+        if event["peak_memory"] is not None:
+            trace_event["args"] = {"peak_memory": event["peak_memory"]}
+        trace_events.append(trace_event)
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def write_report(folder_path, formats, events=None):
+    """Write the recorded stages to report files.
+
+    Parameters:
+        folder_path (str): Folder the reports are written to.
+        formats (list): Any of "json", "csv" and "trace".
+        events (list, optional): Stages to report. Defaults to all recorded stages.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    events = _events if events is None else events
+    os.makedirs(folder_path, exist_ok=True)
+    written_files = []
+    if "json" in formats:
+        file_path = os.path.join(folder_path, "run_report.json")
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "summary": summarize(events),
+                "events": events,
+            }, file, indent=2)
+        written_files.append(file_path)
+    if "csv" in formats:
+        file_path = os.path.join(folder_path, "run_report.csv")
+        with open(file_path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=_CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(events)
+        written_files.append(file_path)
+    if "trace" in formats:
+        file_path = os.path.join(folder_path, "trace.json")
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(chrome_trace(events), file)
+        written_files.append(file_path)
+    for file_path in written_files:
+        logging.info("Saved {0}".format(file_path))
+    return written_files
@@ -0,0 +1,210 @@
+"""Persistent cache that skips rendering charts whose output is current."""
+# Import built-in modules
+import functools
+import hashlib
+from importlib import metadata
+import json
+import logging
+import os
+import pickle
+
+# Import local modules
+import constants
+from scripts import file_utils
+
+# Import third-party modules
+import pandas as pd
+
+
+logging.basicConfig(level=logging.INFO)
+
+# Constants that change the look of every chart.
+_STYLE_CONSTANTS = [
+    "PLOT_FILETYPE_LIST",
+    "PLOTHEIGHT",
+    "PLOTWIDTH",
+    "CUSTOM_COLORS",
+    "TEXTCOLOR",
+    "BACKGROUNDCOLOR",
+    "FONT_FILES",
+    "FONT_STYLES",
+    "EXPORT_POLICIES",
+    "SMOOTHING_POINTS",
+]
+
+
+def _fingerprint(value):
+    """Convert a value into a representation that is stable across runs.
+
+    Parameters:
+        value: Value to convert.
+
+    Returns:
+        object: JSON serializable representation of the value.
+    """
+    if isinstance(value, dict):
+        return {key: _fingerprint(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint(item) for item in value]
+    return value
+
+
+@functools.lru_cache(maxsize=64)
+def _hash_file(file_path, mtime_ns, size):
+    """Hash the content of a file once per modification.
+
+    Parameters:
+        file_path (str): Path of the file.
+        mtime_ns (int): Modification time, part of the cache key.
+        size (int): Size in bytes, part of the cache key.
+
+    Returns:
+        str: SHA-256 of the content.
+    """
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _font_fingerprints():
+    """Hash the content of the font files, a replaced font changes every chart.
+
+    Returns:
+        dict: SHA-256 of each font file keyed by its name in
+              constants.FONT_FILES, None if the file is missing.
+    """
+    fingerprints = {}
+    for name, font_file in constants.FONT_FILES.items():
+        try:
+            stat = os.stat(font_file)
+        except FileNotFoundError:
+            fingerprints[name] = None
+            continue
+        fingerprints[name] = _hash_file(os.path.abspath(font_file), stat.st_mtime_ns, stat.st_size)
+    return fingerprints
+
+
+def _hash_data(data):
+    """Hash the content of a pandas object.
+
+    Parameters:
+        data (pd.DataFrame | pd.Series): Data to hash.
+
+    Returns:
+        bytes: Digest of values, index and labels.
+    """
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    labels = data.columns if isinstance(data, pd.DataFrame) else [data.name]
+    digest.update(repr(list(labels)).encode())
+    return digest.digest()
+
+
+def chart_key(spec):
+    """Compute the cache key of a chart.
+
+    The key covers the aggregated data, title, drawing options, style
+    constants, the content of the font files and the library versions. The footnote timestamp is left
+    out, so touching or appending to a CSV file only invalidates the charts
+    whose data changed.
+
+    Parameters:
+        spec (charts.ChartSpec): Chart to compute the key for.
+
+    Returns:
+        str: Hex digest identifying the rendered output.
+    """
+    digest = hashlib.sha256()
+    digest.update(_hash_data(spec.data))
+    digest.update(pickle.dumps((spec.kind, spec.title, spec.options), protocol=4))
+    style = {name: getattr(constants, name) for name in _STYLE_CONSTANTS}
+    digest.update(json.dumps(_fingerprint(style), sort_keys=True).encode())
+    digest.update(json.dumps(_font_fingerprints(), sort_keys=True).encode())
+    digest.update(constants.VERSION.encode())
+    digest.update(metadata.version("matplotlib").encode())
+    digest.update(metadata.version("seaborn").encode())
+    return digest.hexdigest()
+
+
+def output_files(spec):
+    """List the files a chart is saved to.
+
+    Parameters:
+        spec (charts.ChartSpec): Chart to list the files for.
+
+    Returns:
+        list: Paths of the saved chart, one per file type.
+    """
+    return [
+        file_utils.plot_file_path(spec.title, extension)
+        for extension in constants.PLOT_FILETYPE_LIST
+    ]
+
+
+def load(cache_file=constants.RENDER_CACHE_FILE):
+    """Load the render cache manifest.
+
+    Parameters:
+        cache_file (str, optional): Path of the manifest.
+                                    Defaults to constants.RENDER_CACHE_FILE.
+
+    Returns:
+        dict: Cache keys keyed by chart name.
+    """
+    try:
+        with open(cache_file, encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save(manifest, cache_file=constants.RENDER_CACHE_FILE):
+    """Atomically write the render cache manifest.
+
+    Parameters:
+        manifest (dict): Cache keys keyed by chart name.
+        cache_file (str, optional): Path of the manifest.
+                                    Defaults to constants.RENDER_CACHE_FILE.
+    """
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    tmp_file = "{0}.tmp".format(cache_file)
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(tmp_file, cache_file)
+
+
+def is_current(spec, key, manifest):
+    """Check whether the saved output of a chart matches its cache key.
+
+    Parameters:
+        spec (charts.ChartSpec): Chart to check.
+        key (str): Current cache key of the chart.
+        manifest (dict): Cache keys keyed by chart name.
+
+    Returns:
+        bool: True if the chart does not need to be rendered again.
+    """
+    return manifest.get(spec.name) == key and all(
+        os.path.isfile(fig_file) for fig_file in output_files(spec)
+    )
+
+
+def split_stale(specs, manifest):
+    """Separate charts that need rendering from those that are current.
+
+    Parameters:
+        specs (list): ChartSpecs to check.
+        manifest (dict): Cache keys keyed by chart name.
+
+    Returns:
+        tuple: List of stale ChartSpecs and dict of their keys by chart name.
+    """
+    stale_specs = []
+    keys = {}
+    for spec in specs:
+        key = chart_key(spec)
+        if is_current(spec, key, manifest):
+            logging.info("Skipped {0}, output is current".format(spec.name))
+        else:
+            stale_specs.append(spec)
+            keys[spec.name] = key
+    return stale_specs, keys
@@ -0,0 +1,372 @@
+"""HTTP service rendering single charts on demand."""
+# Import built-in modules
+import dataclasses
+import hashlib
+import json
+import logging
+import threading
+import traceback
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Import local modules
+import constants
+from scripts import charts, export, file_utils, profiling, render_cache, watcher
+
+# Import third-party modules
+from cachetools import LRUCache
+
+
+logging.basicConfig(level=logging.INFO)
+
+# File types a chart can be requested in.
+FORMATS = export.RASTER_FILETYPES | {"svg", "svgz", "pdf", "eps", "ps"}
+_CONTENT_TYPES = {
+    "svg": "image/svg+xml",
+    "svgz": "image/svg+xml",
+    "pdf": "application/pdf",
+    "eps": "application/postscript",
+    "ps": "application/postscript",
+    "jpg": "image/jpeg",
+    "tif": "image/tiff",
+}
+
+
+class ChartService:
+    """Ingested survey data and rendered charts kept in memory between requests.
+
+    Charts are analysed per subgroup on first request and rendered per file
+    type on demand. Rendered files are kept in a least recently used cache
+    bounded by their total size. The cache and the analysed charts are
+    dropped whenever the CSV files change.
+    """
+
+    def __init__(
+        self,
+        generator,
+        skip=None,
+        only=None,
+        cache_bytes=constants.SERVER_CACHE_BYTES,
+    ):
+        """Create a service on top of a plot generator with gathered data.
+
+        Parameters:
+            generator (PlotGenerator): Generator holding the survey data.
+            skip (list, optional): Glob patterns of chart names not to serve.
+            only (list, optional): Glob patterns of chart names to serve,
+                                   None serves all charts.
+            cache_bytes (int, optional): Size of the rendered file cache.
+                                         Defaults to constants.SERVER_CACHE_BYTES.
+        """
+        self.generator = generator
+        self.skip = skip
+        self.only = only
+        # Rendered files keyed by (chart key, file type).
+        self.files = LRUCache(maxsize=cache_bytes, getsizeof=len)
+        # ChartSpecs and their cache keys by chart name, keyed by subgroup.
+        self._charts = {}
+        self._files_lock = threading.Lock()
+        # pyplot and the survey data are shared by all requests.
+        self._render_lock = threading.RLock()
+        self.snapshot = watcher.snapshot(constants.DATA_FOLDER)
+
+    def charts(self, subgroup=None):
+        """Analyse the charts of a subgroup once.
+
+        Parameters:
+            subgroup (str, optional): Name in constants.SERVER_SUBGROUPS,
+                                      None for all responses.
+
+        Raises:
+            ValueError: If the subgroup is unknown.
+
+        Returns:
+            dict: ChartSpec and cache key keyed by chart name, charts without
+                  data are left out.
+        """
+        if subgroup is not None and subgroup not in constants.SERVER_SUBGROUPS:
+            raise ValueError("Unknown subgroup {0}.".format(subgroup))
+        with self._render_lock:
+            if subgroup not in self._charts:
+                cube = None
+                if subgroup is not None:
+                    selection = constants.SERVER_SUBGROUPS[subgroup]
+                    cube = self.generator.cube.where(selection["column"], selection["value"])
+                specs = self.generator.collect_charts(self.skip, self.only, cube)
+                if subgroup is not None:
+                    # E.g. the charts of another age group, nothing to draw.
+                    specs = [
+                        _with_label(spec, selection["label"])
+                        for spec in specs
+                        if charts.has_data(spec)
+                    ]
+                self._charts[subgroup] = {
+                    spec.name: (spec, render_cache.chart_key(spec)) for spec in specs
+                }
+            return self._charts[subgroup]
+
+    def chart(self, name, subgroup=None):
+        """Look up a chart.
+
+        Parameters:
+            name (str): Chart name.
+            subgroup (str, optional): Name in constants.SERVER_SUBGROUPS.
+
+        Raises:
+            KeyError: If the chart does not exist for the subgroup.
+
+        Returns:
+            tuple: ChartSpec and its cache key.
+        """
+        return self.charts(subgroup)[name]
+
+    def render(self, spec, key, extension):
+        """Render a chart to a file in memory, or take it from the cache.
+
+        Parameters:
+            spec (charts.ChartSpec): Chart to render.
+            key (str): Cache key of the chart.
+            extension (str): File type to render.
+
+        Returns:
+            bytes: Content of the file.
+        """
+        cache_key = (key, extension)
+        with self._files_lock:
+            content = self.files.get(cache_key)
+        if content is not None:
+            return content
+        with self._render_lock:
+            # Another request may have rendered it while this one waited.
+            with self._files_lock:
+                content = self.files.get(cache_key)
+            if content is not None:
+                return content
+            with profiling.stage(spec.name, "render"), export.capture([extension]) as files:
+                charts.render(spec)
+            content = files[extension]
+        with self._files_lock:
+            try:
+                self.files[cache_key] = content
+            except ValueError:
+                logging.warning("{0}.{1} is too large to cache".format(spec.name, extension))
+        return content
+
+    def reload(self):
+        """Ingest the CSV files again and drop all analysed and rendered charts."""
+        with self._render_lock:
+            file_utils.get_timestamp.cache_clear()
+            self.generator.gather_data(download=False)
+            self._charts.clear()
+            with self._files_lock:
+                self.files.clear()
+
+    def watch(self, interval=constants.WATCH_INTERVAL, debounce=constants.WATCH_DEBOUNCE):
+        """Reload whenever the CSV files change, runs until the process exits.
+
+        Parameters:
+            interval (float, optional): Seconds between two polls.
+                                        Defaults to constants.WATCH_INTERVAL.
+            debounce (float, optional): Seconds without changes before reloading.
+                                        Defaults to constants.WATCH_DEBOUNCE.
+        """
+        while True:
+            self.snapshot, changed = watcher.wait_for_change(
+                constants.DATA_FOLDER, self.snapshot, interval, debounce
+            )
+            logging.info("Changed {0}, reloading".format(", ".join(changed)))
+            try:
+                self.reload()
+            except Exception:  # noqa: B902 Keep serving the previous data
+                logging.error("Reload failed:\n{0}".format(traceback.format_exc()))
+
+    def index(self, subgroup=None):
+        """Describe the charts that can be requested.
+
+        Parameters:
+            subgroup (str, optional): Name in constants.SERVER_SUBGROUPS.
+
+        Returns:
+            dict: Charts, subgroups, file types and cache usage.
+        """
+        chart_list = [
+            {
+                "name": name,
+                "kind": spec.kind,
+                "title": spec.title,
+                "group": self.generator.chart_groups.get(name),
+            }
+            for name, (spec, _) in self.charts(subgroup).items()
+        ]
+        with self._files_lock:
+            cache = {
+                "files": len(self.files),
+                "bytes": self.files.currsize,
+                "max_bytes": self.files.maxsize,
+            }
+        return {
+            "charts": chart_list,
+            "subgroups": sorted(constants.SERVER_SUBGROUPS),
+            "formats": sorted(FORMATS),
+            "cache": cache,
+        }
+
+
+def _with_label(spec, label):
+    """Mark the title of a subgroup chart.
+
+    Parameters:
+        spec (charts.ChartSpec): Chart of the subgroup.
+        label (str): Label of the subgroup.
+
+    Returns:
+        charts.ChartSpec: Chart with the label appended to its title.
+    """
+    if label in spec.title:
+        return spec
+    return dataclasses.replace(spec, title="{0} {1}".format(spec.title, label))
+
+
+def etag(key, extension):
+    """Build the entity tag of a rendered chart.
+
+    Parameters:
+        key (str): Cache key of the chart.
+        extension (str): File type.
+
+    Returns:
+        str: Quoted entity tag.
+    """
+    return '"{0}"'.format(
+        hashlib.sha256("{0}.{1}".format(key, extension).encode()).hexdigest()[:32]
+    )
+
+
+class ChartRequestHandler(BaseHTTPRequestHandler):
+    """Serve `GET /charts` and `GET /charts/<name>.<format>?subgroup=<name>`."""
+
+    server_version = "vs_csv_plotter/{0}".format(constants.VERSION)
+
+    def do_GET(self):  # noqa: N802 Name required by BaseHTTPRequestHandler
+        """Answer a request for the chart index or a single chart."""
+        url = urllib.parse.urlsplit(self.path)
+        subgroup = urllib.parse.parse_qs(url.query).get("subgroup", [None])[0]
+        path = url.path.rstrip("/")
+        service = self.server.service
+        if subgroup is not None and subgroup not in constants.SERVER_SUBGROUPS:
+            self._send_error(HTTPStatus.BAD_REQUEST, "Unknown subgroup {0}.".format(subgroup))
+            return
+        try:
+            if path == "/charts":
+                self._send_json(service.index(subgroup))
+                return
+            if not path.startswith("/charts/"):
+                self._send_error(HTTPStatus.NOT_FOUND, "Unknown path {0}.".format(path))
+                return
+            name, _, extension = path[len("/charts/"):].rpartition(".")
+            if extension not in FORMATS:
+                self._send_error(
+                    HTTPStatus.BAD_REQUEST, "Unknown format {0}.".format(extension)
+                )
+                return
+            try:
+                spec, key = service.chart(name, subgroup)
+            except KeyError:
+                self._send_error(HTTPStatus.NOT_FOUND, "Unknown chart {0}.".format(name))
+                return
+            tag = etag(key, extension)
+            if tag in self.headers.get("If-None-Match", ""):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", tag)
+                self.end_headers()
+                return
+            self._send_chart(service.render(spec, key, extension), extension, tag)
+        except Exception:  # noqa: B902 A failing chart must not stop the service
+            logging.error("Request {0} failed:\n{1}".format(
+                self.path, traceback.format_exc(),
+            ))
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "Rendering failed.")
+
+    def _send_chart(self, content, extension, tag):
+        """Send a rendered chart.
+
+        Parameters:
+            content (bytes): Content of the file.
+            extension (str): File type.
+            tag (str): Entity tag of the file.
+        """
+        self.send_response(HTTPStatus.OK)
+        self.send_header(
+            "Content-Type", _CONTENT_TYPES.get(extension, "image/{0}".format(extension))
+        )
+        if extension == "svgz":
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("ETag", tag)
+        # Clients keep the chart but check the entity tag on every use.
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_json(self, value, status=HTTPStatus.OK):
+        """Send a JSON document.
+
+        Parameters:
+            value: JSON serializable value.
+            status (HTTPStatus, optional): Response status. Defaults to 200.
+        """
+        content = json.dumps(value, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_error(self, status, message):
+        """Send an error as JSON.
+
+        Parameters:
+            status (HTTPStatus): Response status.
+            message (str): Description of the error.
+        """
+        self._send_json({"error": message}, status)
+
+    def log_message(self, format, *args):  # noqa: A002 Signature of the base class
+        """Log requests with the logging module instead of stderr."""
+        logging.info("{0} {1}".format(self.address_string(), format % args))
+
+
+def serve(
+    generator,
+    host=constants.SERVER_HOST,
+    port=constants.SERVER_PORT,
+    skip=None,
+    only=None,
+):
+    """Serve charts over HTTP until interrupted.
+
+    Parameters:
+        generator (PlotGenerator): Generator holding the survey data.
+        host (str, optional): Address to listen on.
+                              Defaults to constants.SERVER_HOST.
+        port (int, optional): Port to listen on.
+                              Defaults to constants.SERVER_PORT.
+        skip (list, optional): Glob patterns of chart names not to serve.
+        only (list, optional): Glob patterns of chart names to serve.
+    """
+    # Import third-party modules
+    import matplotlib  # noqa: WPS433 Only needed once a chart is drawn
+
+    matplotlib.use("Agg")
+    service = ChartService(generator, skip, only)
+    httpd = ThreadingHTTPServer((host, port), ChartRequestHandler)
+    httpd.service = service
+    threading.Thread(target=service.watch, name="watch", daemon=True).start()
+    logging.info("Serving charts on http://{0}:{1}/charts".format(*httpd.server_address[:2]))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Stopped serving")
+    finally:
+        httpd.server_close()
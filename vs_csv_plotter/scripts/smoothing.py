@@ -0,0 +1,169 @@
+"""Averaging and smoothing of distributions drawn as lines."""
+# Import built-in modules
+import functools
+
+# Import third-party modules
+import numpy as np
+import pandas as pd
+
+
+def weighted_average(plot_data, value_key, group_key, weights=None):
+    """Average a value per x position across groups.
+
+    The x positions are the index of `plot_data`. A group without a row at
+    an x position counts as 0 there, e.g. a rating nobody in the group gave.
+
+    Parameters:
+        plot_data (pd.DataFrame): One row per group and x position.
+        value_key (str): Column with the values to average.
+        group_key (str): Column naming the group of each row.
+        weights (dict, optional): Weight per group, e.g. its number of
+                                  responses. Defaults to equal weights.
+
+    Returns:
+        pd.Series: Weighted average per x position, sorted by x.
+    """
+    table = pd.DataFrame({
+        "x": np.asarray(plot_data.index, dtype="float64"),
+        "group": plot_data[group_key].to_numpy(),
+        "value": plot_data[value_key].to_numpy(dtype="float64"),
+    }).pivot_table(
+        index="x", columns="group", values="value", aggfunc="sum", fill_value=0
+    ).sort_index()
+    group_weights = np.array([
+        (weights or {}).get(group, 1) for group in table.columns
+    ], dtype="float64")
+    return pd.Series(
+        table.to_numpy() @ group_weights / group_weights.sum(),
+        index=table.index,
+        name=value_key,
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def grid(start, stop, points):
+    """Evenly spaced x positions a smoother is evaluated on.
+
+    Parameters:
+        start (float): First position.
+        stop (float): Last position.
+        points (int): Number of positions.
+
+    Returns:
+        np.ndarray: Read-only positions, shared between calls.
+    """
+    positions = np.linspace(start, stop, points)
+    positions.flags.writeable = False
+    return positions
+
+
+def spline(x, y, positions, degree=3):
+    """Interpolate the points with a B-spline.
+
+    Parameters:
+        x (np.ndarray): Sorted x positions of the points.
+        y (np.ndarray): Values of the points.
+        positions (np.ndarray): Positions to evaluate.
+        degree (int, optional): Degree of the spline, lowered for few points.
+
+    Returns:
+        np.ndarray: Interpolated values.
+    """
+    # Import third-party modules
+    from scipy.interpolate import make_interp_spline  # noqa: WPS433 Only needed here
+
+    return make_interp_spline(x, y, k=min(degree, len(x) - 1))(positions)
+
+
+def kde(x, y, positions, bandwidth=None):
+    """Estimate a Gaussian kernel density with the values as weights.
+
+    The result is scaled to the spacing of `x`, so a distribution of shares
+    per rating keeps its scale. The points are mirrored at the edges of the
+    outer bins to avoid the boundary bias of a plain kernel estimate.
+
+    Parameters:
+        x (np.ndarray): Sorted x positions of the points.
+        y (np.ndarray): Non-negative values of the points.
+        positions (np.ndarray): Positions to evaluate.
+        bandwidth (float, optional): Kernel width, defaults to Scott's rule.
+
+    Returns:
+        np.ndarray: Density at the positions.
+    """
+    total = y.sum()
+    if not total:
+        return np.zeros_like(positions)
+    weights = y / total
+    if bandwidth is None:
+        mean = weights @ x
+        std = np.sqrt(weights @ (x - mean) ** 2)
+        effective_points = 1 / (weights @ weights)
+        bandwidth = max(std, np.finfo(float).eps) * effective_points ** (-1 / 5)
+    spacing = np.diff(x).mean() if len(x) > 1 else 1
+    # Mirror the points at the outer bin edges, so no density leaks past them.
+    lower = x[0] - spacing / 2
+    upper = x[-1] + spacing / 2
+    centers = np.concatenate([x, 2 * lower - x, 2 * upper - x])
+    distances = (positions[:, np.newaxis] - centers[np.newaxis, :]) / bandwidth
+    kernels = np.exp(-0.5 * distances ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    return kernels @ np.tile(y, 3) * spacing
+
+
+def lowess(x, y, positions, fraction=0.6):
+    """Fit a locally weighted linear regression at every position.
+
+    Parameters:
+        x (np.ndarray): Sorted x positions of the points.
+        y (np.ndarray): Values of the points.
+        positions (np.ndarray): Positions to evaluate.
+        fraction (float, optional): Share of the points used for each fit.
+
+    Returns:
+        np.ndarray: Fitted values.
+    """
+    neighbours = min(len(x), max(2, int(np.ceil(fraction * len(x)))))
+    distances = np.abs(positions[:, np.newaxis] - x[np.newaxis, :])
+    radius = np.partition(distances, neighbours - 1, axis=1)[:, neighbours - 1]
+    radius = np.maximum(radius, np.finfo(float).eps)[:, np.newaxis]
+    weights = np.clip(1 - (distances / radius) ** 3, 0, None) ** 3
+    weight_sum = weights.sum(axis=1)
+    x_mean = weights @ x / weight_sum
+    y_mean = weights @ y / weight_sum
+    x_centered = x[np.newaxis, :] - x_mean[:, np.newaxis]
+    variance = (weights * x_centered ** 2).sum(axis=1)
+    covariance = (weights * x_centered * (y[np.newaxis, :] - y_mean[:, np.newaxis])).sum(axis=1)
+    slope = np.divide(
+        covariance, variance, out=np.zeros_like(covariance), where=variance > 0
+    )
+    return y_mean + slope * (positions - x_mean)
+
+
+# Smoother name mapped to a function(x, y, positions) returning smoothed values.
+SMOOTHERS = {
+    "spline": spline,
+    "kde": kde,
+    "lowess": lowess,
+}
+
+
+def smooth(series, smoother="spline", points=300):
+    """Smooth a series over an evenly spaced grid between its first and last x.
+
+    Parameters:
+        series (pd.Series): Values indexed by sorted x positions.
+        smoother (str, optional): Name of a smoother in `SMOOTHERS`.
+        points (int, optional): Number of grid positions. Defaults to 300.
+
+    Raises:
+        ValueError: If the smoother is unknown.
+
+    Returns:
+        tuple: Grid positions and smoothed values.
+    """
+    if smoother not in SMOOTHERS:
+        raise ValueError("Unknown smoother {0}.".format(smoother))
+    x = np.asarray(series.index, dtype="float64")
+    y = series.to_numpy(dtype="float64")
+    positions = grid(float(x.min()), float(x.max()), points)
+    return positions, SMOOTHERS[smoother](x, y, positions)
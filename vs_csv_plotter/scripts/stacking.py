@@ -0,0 +1,35 @@
+"""Layer bounds of stacked area charts."""
+# Import third-party modules
+import numpy as np
+
+
+def stack_layers(df, row_index, categories, x_value, y_value):
+    """Compute the lower and upper bound of every layer of a stacked chart.
+
+    The data is pivoted once into a (categories x positions) matrix, a
+    category without a row at a position counts as 0 there, and a single
+    cumulative sum gives all bounds.
+
+    Parameters:
+        df (pd.DataFrame): One row per category and x position.
+        row_index (str): The column in the DataFrame used as the category.
+        categories (list): Categories in stacking order, from the bottom.
+        x_value (str): The column in the DataFrame used as the x-axis values.
+        y_value (str): The column in the DataFrame used as the y-axis values.
+
+    Returns:
+        tuple: Sorted unique x positions and an array of shape
+               (len(categories) + 1, positions), layer i spans rows i and i + 1.
+    """
+    matrix = df.pivot_table(
+        index=row_index,
+        columns=x_value,
+        values=y_value,
+        aggfunc="sum",
+        fill_value=0,
+        observed=True,
+    ).reindex(index=list(categories), fill_value=0).sort_index(axis=1)
+    values = matrix.to_numpy(dtype="float64")
+    bounds = np.zeros((len(values) + 1, values.shape[1]))
+    np.cumsum(values, axis=0, out=bounds[1:])
+    return matrix.columns.to_numpy(), bounds
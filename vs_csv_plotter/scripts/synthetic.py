@@ -0,0 +1,94 @@
+"""Synthetic survey exports with the schema of the real CSV files."""
+# Import built-in modules
+import os
+
+# Import local modules
+import constants
+
+# Import third-party modules
+import numpy as np
+import pandas as pd
+
+
+_WEEKDAYS = [
+    "Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"
+]
+_MONTH_NAMES = [
+    "Januar", "Februar", "März", "April", "Mai", "Juni",
+    "Juli", "August", "September", "Oktober", "November", "Dezember"
+]
+# Submissions are spread over the survey period.
+_SURVEY_START = pd.Timestamp("2023-10-16")
+_SURVEY_DAYS = 45
+
+
+def german_timestamps(timestamps):
+    """Format timestamps like the "Zeitstempel" column of the export.
+
+    Parameters:
+        timestamps (pd.DatetimeIndex): Timestamps to format.
+
+    Returns:
+        pd.Series: Strings like "Montag, 16. Oktober 2023 um 09:05:00 GMT+0:00".
+    """
+    weekdays = np.array(_WEEKDAYS, dtype=object)[timestamps.weekday]
+    months = np.array(_MONTH_NAMES, dtype=object)[timestamps.month - 1]
+    days = timestamps.day.astype(str)
+    years = timestamps.year.astype(str)
+    times = timestamps.strftime("%H:%M:%S")
+    return pd.Series(
+        weekdays + ", " + days + ". " + months + " " + years
+        + " um " + np.asarray(times, dtype=object) + " GMT+0:00"
+    )
+
+
+def survey_frame(rows, seed=0):
+    """Generate random survey responses.
+
+    Roughly one in ten ratings is left empty, like skipped questions in the
+    real export.
+
+    Parameters:
+        rows (int): Number of responses.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: Responses with the German column headers and answers.
+    """
+    rng = np.random.default_rng(seed)
+    offsets = pd.to_timedelta(
+        np.sort(rng.integers(0, _SURVEY_DAYS * 24 * 3600, rows)), unit="s"
+    )
+    ratings = pd.array(rng.integers(1, 11, rows), dtype="Int8")
+    ratings[rng.random(rows) < 0.1] = pd.NA
+    return pd.DataFrame({
+        "Nutzer*in": ["anon-{0}".format(index) for index in range(rows)],
+        constants.TIMESTAMP_COLUMN: german_timestamps(
+            pd.DatetimeIndex(_SURVEY_START + offsets)
+        ),
+        constants.AGE_COLUMN: rng.choice(
+            [constants.UNDER_26, constants.OVER_26], rows, p=[0.7, 0.3]
+        ),
+        constants.RATING_COLUMN: ratings,
+        constants.SUPPORT_COLUMN: rng.choice(
+            ["Ja", "Nein", "Unentschlossen"], rows, p=[0.6, 0.25, 0.15]
+        ),
+        constants.YOUTH_TICKET_COLUMN: rng.choice(["Ja", "Nein"], rows),
+        constants.D_TICKET_COLUMN: rng.choice(["Ja", "Nein"], rows, p=[0.4, 0.6]),
+    })
+
+
+def write_survey_csv(file_path, rows, seed=0):
+    """Write a synthetic survey export.
+
+    Parameters:
+        file_path (str): Path of the CSV file.
+        rows (int): Number of responses.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        str: Path of the written file.
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    survey_frame(rows, seed).to_csv(file_path, index=False)
+    return file_path
@@ -0,0 +1,76 @@
+"""Polling watcher for new or changed CSV files."""
+# Import built-in modules
+import logging
+import os
+import time
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+def snapshot(folder_path):
+    """Record the size and modification time of the CSV files in a folder.
+
+    Parameters:
+        folder_path (str): Folder to look at.
+
+    Returns:
+        dict: (size, modification time in ns) keyed by file name, empty if the
+              folder does not exist.
+    """
+    try:
+        entries = list(os.scandir(folder_path))
+    except FileNotFoundError:
+        return {}
+    files = {}
+    for entry in entries:
+        if entry.is_file() and entry.name.endswith(".csv"):
+            stat = entry.stat()
+            files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def changed_files(previous, current):
+    """List the files that were added, modified or removed.
+
+    Parameters:
+        previous (dict): Earlier result of `snapshot`.
+        current (dict): Later result of `snapshot`.
+
+    Returns:
+        list: Sorted names of the changed files.
+    """
+    return sorted(
+        name for name in previous.keys() | current.keys()
+        if previous.get(name) != current.get(name)
+    )
+
+
+def wait_for_change(folder_path, previous, interval, debounce):
+    """Block until the CSV files in a folder changed and settled.
+
+    After the first change the folder is polled until it has not changed
+    for `debounce` seconds, so a file that is still being copied or several
+    files dropped at once trigger a single update.
+
+    Parameters:
+        folder_path (str): Folder to watch.
+        previous (dict): Result of `snapshot` the changes are relative to.
+        interval (float): Seconds between two polls.
+        debounce (float): Seconds without changes before returning.
+
+    Returns:
+        tuple: The settled snapshot and the names of the changed files.
+    """
+    current = snapshot(folder_path)
+    while not changed_files(previous, current):
+        time.sleep(interval)
+        current = snapshot(folder_path)
+    settled_since = time.monotonic()
+    while time.monotonic() - settled_since < debounce:
+        time.sleep(min(interval, debounce))
+        latest = snapshot(folder_path)
+        if latest != current:
+            current = latest
+            settled_since = time.monotonic()
+    return current, changed_files(previous, current)